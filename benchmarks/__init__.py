@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Initialization file for benchmarks package. Benchmarks are run from
+# the top directory of the repository, ex: `python -m benchmarks.scaling`
+#
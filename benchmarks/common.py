@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Common helpers for benchmark scripts: timing, memory measurement,
+# growth exponent fitting and result file output.
+#
+# Result files are JSON documents in the form of:
+#
+#   {"suite": "scaling", "results": {"qfp/generate/32": {...}, ...}}
+#
+# where each result has at least `median` (seconds) and optionally
+# `peak_memory` (bytes) and `size` (bytes) fields. `compare.py` uses
+# these fields to detect regressions.
+#
+
+import sys, os, json, gc, platform
+from math import log
+from timeit import default_timer as timer
+
+try:
+    import tracemalloc
+except ImportError: # python 2
+    tracemalloc = None
+
+def median(values):
+    """Returns the median of a list of numbers."""
+    s = sorted(values)
+    n = len(s)
+    if n == 0:
+        raise ValueError("median of empty list")
+    if n % 2:
+        return s[n//2]
+    return (s[n//2-1] + s[n//2]) / 2.
+
+def _resetPeakRSS():
+    """Resets the peak resident memory counter of this process (Linux
+    only). Returns False if not supported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except (IOError, OSError):
+        return False
+
+def _peakRSS():
+    """Returns the peak resident memory of this process in bytes."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError):
+        pass
+    import resource
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on linux, bytes on mac
+    return r if sys.platform == 'darwin' else r * 1024
+
+def measure(func, repeat=3, memory='rss'):
+    """Runs `func` `repeat` times and returns a result dictionary.
+
+    `memory` : 'rss' measures peak resident memory of the process,
+               which includes allocations of C++ libraries (OCC),
+               'python' measures peak of python allocations only
+               (falls back to 'rss' if tracemalloc isn't available),
+               None disables memory measurement
+
+    Tracing python allocations slows down allocation heavy code a lot,
+    so with 'python' the timed runs aren't traced and peak memory is
+    measured in a separate run.
+
+    Return value of the last `func` call is stored in 'value' key.
+    """
+    if memory == 'python' and not tracemalloc:
+        memory = 'rss'
+    times = []
+    peak = None
+    value = None
+    for i in range(repeat):
+        gc.collect()
+        if memory == 'rss':
+            # if counter can't be reset only the growth is measured
+            base = 0 if _resetPeakRSS() else _peakRSS()
+        t = timer()
+        value = func()
+        times.append(timer() - t)
+        if memory == 'rss':
+            p = _peakRSS() - base
+            peak = p if peak is None else max(peak, p)
+    if memory == 'python':
+        value = None # not to count it in the peak
+        gc.collect()
+        tracemalloc.start()
+        value = func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    r = {'median': median(times), 'min': min(times), 'times': times}
+    if peak is not None:
+        r['peak_memory'] = peak
+    r['value'] = value
+    return r
+
+def fitExponent(xs, ys):
+    """Fits `y = c * x^k` to given points with least squares in log-log
+    space and returns `k`. Returns `None` if there isn't enough data."""
+    points = [(log(x), log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    n = float(len(points))
+    mx = sum(p[0] for p in points) / n
+    my = sum(p[1] for p in points) / n
+    sxx = sum((p[0]-mx)**2 for p in points)
+    if sxx == 0:
+        return None
+    sxy = sum((p[0]-mx)*(p[1]-my) for p in points)
+    return sxy / sxx
+
+def fileSize(path):
+    return os.path.getsize(path)
+
+def writeResults(filename, suite, results, **extra):
+    """Writes benchmark results to a JSON file.
+
+    `results` : dictionary of result dictionaries keyed by benchmark name
+    `extra` : additional top level fields
+    """
+    clean = {}
+    for name, r in results.items():
+        clean[name] = dict((k, v) for k, v in r.items() if k != 'value')
+    doc = {
+        'suite': suite,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': clean
+    }
+    doc.update(extra)
+    with open(filename, 'w') as f:
+        json.dump(doc, f, indent=1, sort_keys=True)
+
+def formatSize(n):
+    """Formats a byte count for humans."""
+    if n is None:
+        return '-'
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n) < 1024. or unit == 'GB':
+            return "%.1f%s" % (n, unit) if unit != 'B' else "%d%s" % (n, unit)
+        n /= 1024.
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Compares benchmark results against a stored baseline and fails if
+# any benchmark regressed beyond a threshold. Checked metrics are
+# median time, peak memory and output size.
+#
+# Check results (exits with status 1 on regression):
+#
+#     python -m benchmarks.compare scaling.json exporters.json
+#
+# Refresh the baseline with new results:
+#
+#     python -m benchmarks.compare --update scaling.json exporters.json
+#
+
+import argparse, json, os, sys
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# metric key, description, name of the threshold argument
+METRICS = [
+    ('median', 'time', 'threshold'),
+    ('peak_memory', 'peak memory', 'memory_threshold'),
+    ('size', 'output size', 'size_threshold'),
+]
+
+def loadResults(filenames):
+    """Loads and merges `results` of given benchmark result files."""
+    results = {}
+    for fname in filenames:
+        with open(fname) as f:
+            doc = json.load(f)
+        results.update(doc['results'])
+    return results
+
+def compare(baseline, results, thresholds, min_time=0.):
+    """Compares results against the baseline.
+
+    `thresholds` : dictionary of allowed relative increase for each
+                   metric key, ex: {'median': 0.1} allows 10% slow down
+    `min_time` : time regressions are ignored if both baseline and
+                 current median are below this value (noise)
+
+    Returns a tuple of lists (regressions, improvements, missing). First
+    two are lists of tuples: (name, metric, old value, new value).
+    """
+    regressions = []
+    improvements = []
+    missing = []
+    for name in sorted(results):
+        if not name in baseline:
+            missing.append(name)
+            continue
+        old = baseline[name]
+        new = results[name]
+        for metric, threshold in thresholds.items():
+            if old.get(metric) is None or new.get(metric) is None:
+                continue
+            o, n = old[metric], new[metric]
+            if metric == 'median' and max(o, n) < min_time:
+                continue
+            if n > o * (1 + threshold):
+                regressions.append((name, metric, o, n))
+            elif n < o * (1 - threshold):
+                improvements.append((name, metric, o, n))
+    return regressions, improvements, missing
+
+def updateBaseline(filename, results):
+    """Writes given results to baseline file. Benchmarks that already
+    exist in the baseline and are not in `results` are kept."""
+    baseline = {}
+    if os.path.exists(filename):
+        with open(filename) as f:
+            baseline = json.load(f)['results']
+    for name, r in results.items():
+        baseline[name] = dict((m[0], r[m[0]]) for m in METRICS if r.get(m[0]) is not None)
+    with open(filename, 'w') as f:
+        json.dump({'results': baseline}, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+def formatChange(metric, o, n):
+    change = (float(n)/o - 1) * 100 if o else float('inf')
+    if metric == 'median':
+        return "%.4fs -> %.4fs (%+.1f%%)" % (o, n, change)
+    return "%d -> %d (%+.1f%%)" % (o, n, change)
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Check benchmark results for performance regressions.")
+    parser.add_argument('results', nargs='+', metavar='RESULTS',
+                        help="JSON result file(s) of benchmark scripts")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="baseline file (default: %(default)s)")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed relative increase of median time (default: %(default)s)")
+    parser.add_argument('--memory-threshold', type=float, default=0.2,
+                        help="allowed relative increase of peak memory (default: %(default)s)")
+    parser.add_argument('--size-threshold', type=float, default=0.01,
+                        help="allowed relative increase of output size (default: %(default)s)")
+    parser.add_argument('--min-time', type=float, default=0.001,
+                        help="ignore time changes of benchmarks faster than this (seconds)")
+    parser.add_argument('--update', action='store_true',
+                        help="update the baseline with given results instead of checking")
+    args = parser.parse_args()
+
+    results = loadResults(args.results)
+
+    if args.update:
+        updateBaseline(args.baseline, results)
+        print("Baseline %s updated with %d benchmarks." % (args.baseline, len(results)))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Baseline file %s doesn't exist, create it with --update." % args.baseline)
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+
+    thresholds = dict((m[0], getattr(args, m[2])) for m in METRICS)
+    regressions, improvements, missing = compare(baseline, results, thresholds, args.min_time)
+
+    descriptions = dict((m[0], m[1]) for m in METRICS)
+    for name in missing:
+        print("NEW        %s (not in baseline)" % name)
+    for name, metric, o, n in improvements:
+        print("IMPROVED   %s %s: %s" % (name, descriptions[metric], formatChange(metric, o, n)))
+    for name, metric, o, n in regressions:
+        print("REGRESSED  %s %s: %s" % (name, descriptions[metric], formatChange(metric, o, n)))
+
+    if regressions:
+        print("%d regression(s) found." % len(regressions))
+        return 1
+    print("No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
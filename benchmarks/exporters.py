@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Microbenchmarks for mesh writers: `meshToVRML`, `getShapeNode` and
+# `exportX3D`. Meshes are randomly generated, FreeCAD is not needed;
+# a minimal stand-in `Vector` type is used for vertex coordinates.
+#
+# Run from the top directory of the repository:
+#
+#     python -m benchmarks.exporters --max-triangles 100000
+#
+
+import argparse, os, random, shutil, tempfile
+from collections import namedtuple
+import xml.etree.ElementTree as et
+from benchmarks.common import measure, writeResults, formatSize
+
+from e3dmg import Material
+from e3dmg.exporters.export_x3d import Mesh, getShapeNode, exportX3D
+from e3dmg.exporters.export_vrml import meshToVRML
+
+SIZES = [1000, 10000, 100000, 1000000, 5000000]
+
+class Vector(namedtuple('Vector', ['x', 'y', 'z'])):
+    """Stand-in for `FreeCAD.Vector`, only provides what writers use."""
+    __slots__ = ()
+
+    def __mul__(self, f):
+        return Vector(self.x*f, self.y*f, self.z*f)
+
+material = Material(diffuseColor = (.3, .3, .3),
+                    ambientIntensity = 0.3,
+                    specularColor = (.7, .7, .8),
+                    shininess = .09)
+
+def randomMesh(ntriangles, seed=0):
+    """Returns a `Mesh` with `ntriangles` random triangles. Number of
+    vertices is about half of the triangles as in a closed surface."""
+    rnd = random.Random(seed)
+    npoints = ntriangles//2 + 3
+    u = rnd.uniform
+    points = [Vector(u(-10, 10), u(-10, 10), u(-10, 10)) for i in range(npoints)]
+    r = rnd.randrange
+    faces = [(r(npoints), r(npoints), r(npoints)) for i in range(ntriangles)]
+    return Mesh(points=points, faces=faces, color=material)
+
+def benchVRML(mesh):
+    return len(meshToVRML(mesh))
+
+def benchShapeNode(mesh):
+    return getShapeNode(mesh.points, mesh.faces, mesh.color)
+
+def benchX3D(mesh, filename):
+    exportX3D([mesh], filename)
+    return os.path.getsize(filename)
+
+def throughput(r, ntriangles):
+    """Adds throughput fields to result `r`."""
+    t = r['median']
+    r['triangles'] = ntriangles
+    r['triangles_per_s'] = ntriangles / t if t else None
+    if r.get('size') is not None:
+        r['mb_per_s'] = r['size'] / 1e6 / t if t else None
+    return r
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Measure throughput of mesh writers with random meshes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help="triangle counts of the benchmark meshes")
+    parser.add_argument('--max-triangles', type=int, default=None,
+                        help="skip meshes larger than this")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="number of repetitions for each measurement")
+    parser.add_argument('--output', metavar='FILE',
+                        help="write results to a JSON file")
+    args = parser.parse_args()
+
+    sizes = [n for n in args.sizes
+             if args.max_triangles is None or n <= args.max_triangles]
+
+    odir = tempfile.mkdtemp(prefix='e3dmg-bench-')
+    fname = os.path.join(odir, 'mesh.x3d')
+    results = {}
+    try:
+        print("%-14s %10s %10s %12s %12s %10s" %
+              ('writer', 'triangles', 'median', 'MB/s', 'triangles/s', 'peak mem'))
+        for n in sizes:
+            mesh = randomMesh(n)
+
+            r = measure(lambda: benchVRML(mesh), args.repeat, memory='python')
+            r['size'] = r['value']
+            results["exporters/meshToVRML/%d" % n] = throughput(r, n)
+
+            r = measure(lambda: benchShapeNode(mesh), args.repeat, memory='python')
+            r['size'] = len(et.tostring(r['value']))
+            results["exporters/getShapeNode/%d" % n] = throughput(r, n)
+
+            r = measure(lambda: benchX3D(mesh, fname), args.repeat, memory='python')
+            r['size'] = r['value']
+            results["exporters/exportX3D/%d" % n] = throughput(r, n)
+
+            for writer in ['meshToVRML', 'getShapeNode', 'exportX3D']:
+                r = results["exporters/%s/%d" % (writer, n)]
+                print("%-14s %10d %9.3fs %12.1f %12.0f %10s" %
+                      (writer, n, r['median'], r['mb_per_s'],
+                       r['triangles_per_s'], formatSize(r.get('peak_memory'))))
+    finally:
+        shutil.rmtree(odir)
+
+    if args.output:
+        writeResults(args.output, 'exporters', results)
+
+if __name__ == "__main__":
+    run()
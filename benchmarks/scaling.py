@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Pin count scaling benchmark for QFP, QFN and DIP generators.
+#
+# Generates synthetic packages with increasing number of pins and
+# measures time spent in each stage: generation (cadquery modeling),
+# tessellation and export (X3D and simple VRML writers). A power law
+# (time = c * pins^k) is fitted to each stage and the growth exponent
+# `k` is reported. An exponent close to 1 means linear scaling.
+#
+# This benchmark requires cadquery and FreeCAD. Run it from the top
+# directory of the repository:
+#
+#     python -m benchmarks.scaling --output scaling.json
+#
+
+import argparse, os, shutil, tempfile
+from benchmarks.common import measure, fitExponent, writeResults, formatSize
+
+STAGES = ['generate', 'tessellate', 'export']
+
+QFP_PINS = [8, 16, 32, 64, 128, 256]
+QFN_PINS = [8, 16, 32, 64, 128, 256]
+DIP_PINS = [8, 16, 24, 32, 48, 64]
+
+def makeQFP(npins):
+    """Returns a QFP generator with `npins` pins, dimensions are
+    calculated to fit the pins with 0.5mm pitch."""
+    from e3dmg.generators.qfp import QFPGen
+    n = npins//4
+    e = 0.5
+    b = 0.22
+    D1 = (n-1)*e + b + 2.0 # leave 1mm on each side for corner chamfers
+    return QFPGen(D=D1+2., E=D1+2., D1=D1, E1=D1, A1=0.1, A2=1.0,
+                  b=b, e=e, npx=n, npy=n, epad=None)
+
+def makeQFN(npins):
+    """Returns a QFN generator with `npins` pins and an exposed pad."""
+    from e3dmg.generators.qfn import BaseQFNGen
+    n = npins//4
+    e = 0.5
+    D = (n+1)*e + 0.5
+    return BaseQFNGen(D=D, E=D, A=0.9, A1=0.02, b=0.25, e=e,
+                      npx=n, npy=n, epad=D-1.5)
+
+def makeDIP(npins):
+    """Returns a 300mil DIP generator with `npins` pins."""
+    from e3dmg.generators.dip import DIP300Gen
+    return DIP300Gen(D=npins/2*2.54-0.9, npins=npins)
+
+FAMILIES = {
+    'qfp': (makeQFP, QFP_PINS),
+    'qfn': (makeQFN, QFN_PINS),
+    'dip': (makeDIP, DIP_PINS),
+}
+
+def tessellate(model):
+    from e3dmg.exporters.export import shapeToMesh
+    return [shapeToMesh(p[0].toFreecad(), p[1]) for p in model.parts]
+
+def writeMeshes(meshes, odir):
+    """Exports meshes as X3D and VRML, returns total output size."""
+    from e3dmg.exporters.export_x3d import exportX3D
+    from e3dmg.exporters.export_vrml import exportVRML
+    x3d = os.path.join(odir, 'model.x3d')
+    wrl = os.path.join(odir, 'model.wrl')
+    exportX3D(meshes, x3d)
+    exportVRML(meshes, wrl)
+    return os.path.getsize(x3d) + os.path.getsize(wrl)
+
+def runFamily(family, pins, repeat, odir):
+    """Benchmarks a generator family for each pin count. Returns a
+    dictionary of results keyed by benchmark name."""
+    make, _ = FAMILIES[family]
+    results = {}
+    for n in pins:
+        generator = make(n)
+        prefix = "scaling/%s/%%s/%d" % (family, n)
+
+        r = measure(generator.generate, repeat)
+        model = r['value']
+        results[prefix % 'generate'] = r
+
+        r = measure(lambda: tessellate(model), repeat)
+        meshes = r['value']
+        r['triangles'] = sum(len(m.faces) for m in meshes)
+        results[prefix % 'tessellate'] = r
+
+        r = measure(lambda: writeMeshes(meshes, odir), repeat)
+        r['size'] = r['value']
+        results[prefix % 'export'] = r
+
+        print("%s %4d pins: generate %.3fs, tessellate %.3fs (%d triangles), export %.3fs (%s)" %
+              (family, n,
+               results[prefix % 'generate']['median'],
+               results[prefix % 'tessellate']['median'],
+               results[prefix % 'tessellate']['triangles'],
+               results[prefix % 'export']['median'],
+               formatSize(results[prefix % 'export']['size'])))
+    return results
+
+def exponents(results, family, pins):
+    """Returns fitted growth exponents for each stage of a family."""
+    r = {}
+    for stage in STAGES:
+        times = [results["scaling/%s/%s/%d" % (family, stage, n)]['median'] for n in pins]
+        r[stage] = fitExponent(pins, times)
+    return r
+
+def initParser():
+    parser = argparse.ArgumentParser(
+        description="Measure how generators scale with the number of pins.")
+    parser.add_argument('--family', nargs='+', choices=sorted(FAMILIES.keys()),
+                        default=sorted(FAMILIES.keys()),
+                        help="generator families to benchmark")
+    parser.add_argument('--max-pins', type=int, default=None,
+                        help="skip pin counts larger than this")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="number of repetitions for each measurement")
+    parser.add_argument('--output', metavar='FILE',
+                        help="write results to a JSON file")
+    return parser
+
+def run():
+    args = initParser().parse_args()
+
+    odir = tempfile.mkdtemp(prefix='e3dmg-bench-')
+    results = {}
+    growth = {}
+    try:
+        for family in args.family:
+            pins = [n for n in FAMILIES[family][1]
+                    if args.max_pins is None or n <= args.max_pins]
+            results.update(runFamily(family, pins, args.repeat, odir))
+            growth[family] = exponents(results, family, pins)
+    finally:
+        shutil.rmtree(odir)
+
+    print("\nGrowth exponents (time ~ pins^k):")
+    print("%-6s %10s %10s %10s" % tuple(['family'] + STAGES))
+    for family in args.family:
+        print("%-6s %10s %10s %10s" % tuple(
+            [family] + ["%.2f" % growth[family][s] if growth[family][s] is not None else '-'
+                        for s in STAGES]))
+
+    if args.output:
+        writeResults(args.output, 'scaling', results, exponents=growth)
+
+if __name__ == "__main__":
+    run()
@@ -24,4 +24,5 @@
 
 from e3dmg.componentmodel import ComponentModel
 from e3dmg.componentmodel import Material
+from e3dmg.componentmodel import Deferred
 from e3dmg.generator import Generator
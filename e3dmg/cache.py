@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Persistent cache of generated models. Generating a model with
+# cadquery booleans is the costliest part of a build; if a component
+# was generated before with the same generator class, parameters and
+# generator source code, its parts are read from the cache instead.
+#
+# Cache is content addressed: each model is a directory named by the
+# hash of its key and contains a BREP file for each part and a
+# 'model.json' file with part names, colors and metadata:
+#
+#     CACHEDIR/ab/abcdef.../model.json
+#     CACHEDIR/ab/abcdef.../0.brep
+#
+# Only the parts that are built are stored (see `Deferred` in
+# componentmodel.py), missing parts are added by later builds.
+#
+# All files are written through temporary files and renamed into
+# place, models are evicted by renaming their directory before
+# removing it. Thus several processes and machines can share a cache
+# directory; at worst a model is generated again.
+#
+
+import os, sys, json, hashlib, inspect, socket, shutil, time, itertools
+from e3dmg.componentmodel import ComponentModel, Material
+from e3dmg.dbutils import LazyGenerator
+from e3dmg.distribute import makedirs, writeAtomic
+
+_sources = {} # generator class: hash of source files
+
+def moduleFile(module):
+    """Returns the python source file of a module, `None` if unknown."""
+    filename = getattr(module, '__file__', None)
+    if filename and filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+    return filename
+
+def moduleDependencies(module):
+    """Returns the e3dmg modules used by a module, directly or through
+    other e3dmg modules, including itself."""
+    modules = {}
+    stack = [module]
+    while stack:
+        module = stack.pop()
+        if module.__name__ in modules:
+            continue
+        modules[module.__name__] = module
+        for value in list(vars(module).values()):
+            name = value.__name__ if inspect.ismodule(value) else \
+                   getattr(value, '__module__', None)
+            if name and name.startswith('e3dmg.') and name in sys.modules:
+                stack.append(sys.modules[name])
+    return list(modules.values())
+
+def sourceFiles(cls):
+    """Returns source files a generator class depends on: modules of
+    the class and its bases and e3dmg modules they use."""
+    files = set()
+    for c in inspect.getmro(cls):
+        if c is not object:
+            files.update(moduleFile(m) for m in
+                         moduleDependencies(sys.modules[c.__module__]))
+    files.discard(None)
+    return sorted(files)
+
+def sourceHash(cls):
+    """Returns a hash of the source files of a generator class."""
+    if not cls in _sources:
+        h = hashlib.sha1()
+        for filename in sourceFiles(cls):
+            with open(filename, 'rb') as f:
+                h.update(f.read())
+        _sources[cls] = h.hexdigest()
+    return _sources[cls]
+
+def encodeValue(value):
+    """JSON encoder of generator parameters and colors."""
+    if isinstance(value, Material):
+        return {'material': vars(value)}
+    if hasattr(value, '__dict__') and not callable(value):
+        return vars(value)
+    return repr(value) # may not be stable, at worst it's a cache miss
+
+def decodeColor(value):
+    if isinstance(value, dict):
+        return Material(**dict((str(k), tuple(v) if isinstance(v, list) else v)
+                               for k, v in value['material'].items()))
+    return tuple(value)
+
+def generatorInstance(generator):
+    """Returns the actual generator object of a database entry."""
+    if isinstance(generator, LazyGenerator):
+        return generator.instance()
+    return generator
+
+def generatorKey(generator):
+    """Returns the cache key of a generator object: a hash of its class,
+    parameters and source code."""
+    generator = generatorInstance(generator)
+    cls = type(generator)
+    key = {'generator': "%s.%s" % (cls.__module__, cls.__name__),
+           'params': vars(generator),
+           'source': sourceHash(cls)}
+    return hashlib.sha1(json.dumps(key, sort_keys=True,
+                                   default=encodeValue).encode('utf-8')).hexdigest()
+
+def writeBrep(cqobject, filename):
+    """Writes the shape of a cqobject to a BREP file atomically."""
+    tmp = "%s.%s-%d.tmp" % (filename, socket.gethostname(), os.getpid())
+    cqobject.toFreecad().exportBrep(tmp)
+    os.rename(tmp, filename)
+
+def readBrep(filename):
+    """Reads a BREP file as a cadquery object, like the parts generators
+    create (a bare shape doesn't have `toFreecad`)."""
+    import Part
+    import cadquery as cq
+    return cq.CQ(cq.Shape.cast(Part.read(filename)))
+
+def dirSize(path):
+    """Returns total size of the files in a directory."""
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+class ModelCache(object):
+    """On-disk cache of generated models.
+
+    `path` : cache directory
+    `maxSize` : size limit of the cache in bytes, least recently used
+                models are removed when it's exceeded
+    """
+
+    def __init__(self, path, maxSize=None):
+        self.path = path
+        self.maxSize = maxSize
+        self.size = None # estimated size, updated by stores of this process
+        self.hits = 0
+        self.misses = 0
+        makedirs(path)
+
+    def _dir(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def _readInfo(self, key):
+        try:
+            with open(os.path.join(self._dir(key), 'model.json')) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def load(self, generator, names=None):
+        """Returns the cached model of a generator, `None` if it's not
+        in cache.
+
+        `names` : names of the parts that are needed, all parts if
+                  `None`. Returned model contains only these parts.
+        """
+        key = generatorKey(generator)
+        info = self._readInfo(key)
+        model = None
+        if info:
+            parts = [p for p in info['parts'] if names is None or p['name'] in names]
+            # an empty selection is a miss, generator reports missing parts
+            if parts and all(p['file'] for p in parts):
+                model = ComponentModel()
+                try:
+                    for p in parts:
+                        model.addPart(readBrep(os.path.join(self._dir(key), p['file'])),
+                                      decodeColor(p['color']), p['name'])
+                    # mark as recently used
+                    os.utime(os.path.join(self._dir(key), 'model.json'), None)
+                except Exception: # evicted meanwhile or unreadable
+                    model = None
+        if model is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return model
+
+    def store(self, generator, model, names=None):
+        """Stores a generated model. Parts with given `names` (all parts
+        if `None`) are built if they are deferred; other deferred parts
+        are stored only if they are built already."""
+        key = generatorKey(generator)
+        path = self._dir(key)
+        # build parts that will be exported anyway
+        (model if names is None else model.select(names)).parts
+        old = self._readInfo(key)
+        oldFiles = dict((p['name'], p['file']) for p in old['parts']) if old else {}
+
+        try:
+            makedirs(path)
+            oldSize = dirSize(path)
+            parts = []
+            for i, (cqobject, color, name) in enumerate(model.builtParts()):
+                filename = None
+                if cqobject is not None:
+                    filename = "%d.brep" % i
+                    if not os.path.exists(os.path.join(path, filename)):
+                        writeBrep(cqobject, os.path.join(path, filename))
+                elif oldFiles.get(name) and \
+                     os.path.exists(os.path.join(path, oldFiles[name])):
+                    filename = oldFiles[name]
+                parts.append({'name': name, 'color': color, 'file': filename})
+            cls = type(generatorInstance(generator))
+            info = {'key': key, 'generator': "%s.%s" % (cls.__module__, cls.__name__),
+                    'parts': parts, 'time': time.time()}
+            writeAtomic(os.path.join(path, 'model.json'),
+                        json.dumps(info, default=encodeValue))
+            stored = dirSize(path) - oldSize
+        except (IOError, OSError) as e:
+            # evicted meanwhile or disk is full, cache is best effort
+            print("Couldn't store model in cache: %s" % e)
+            return
+        if self.maxSize:
+            # whole cache is scanned only when the estimate exceeds the
+            # limit, eviction leaves room for many models
+            if self.size is None:
+                self.size = sum(e[1] for e in self.entries())
+            else:
+                self.size += stored
+            if self.size > self.maxSize:
+                self.evict()
+
+    def entries(self):
+        """Returns a list of (last use time, size, directory) of cached
+        models."""
+        entries = []
+        for d in os.listdir(self.path):
+            if d.startswith('.') or not os.path.isdir(os.path.join(self.path, d)):
+                continue
+            for key in os.listdir(os.path.join(self.path, d)):
+                path = os.path.join(self.path, d, key)
+                try:
+                    size = dirSize(path)
+                    used = os.path.getmtime(os.path.join(path, 'model.json'))
+                except OSError: # being stored or evicted
+                    continue
+                entries.append((used, size, path))
+        return entries
+
+    def evict(self):
+        """Removes least recently used models until the cache is 10%
+        below its size limit."""
+        entries = sorted(self.entries())
+        size = self.size = sum(e[1] for e in entries)
+        if size <= self.maxSize:
+            return
+        counter = itertools.count()
+        for used, esize, path in entries:
+            if size <= self.maxSize * 0.9:
+                break
+            trash = os.path.join(self.path, ".evict-%s-%d-%d" %
+                                 (socket.gethostname(), os.getpid(), next(counter)))
+            try:
+                os.rename(path, trash)
+            except OSError: # evicted by another process
+                continue
+            shutil.rmtree(trash, ignore_errors=True)
+            size -= esize
+        self.size = size
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Catalog of the component database in a SQLite file, for selecting
+# components by their dimensions and parameters:
+#
+#     ./make.py --query "pins > 32 AND pitch = 0.5" --list-all
+#     ./make.py --query "height > 3" --step
+#
+# `components` table has a row for each database entry with common
+# dimensions that are returned by `Generator.dimensions()`:
+#
+#     key ('qfn:QFN16_3x3_NG'), module ('qfn'), name, generator (class
+#     path), pins, pitch, length, width, height
+#
+# Dimension columns are indexed. All attributes of generator objects
+# are in `params` table as (key, name, value) rows, indexed by name
+# and value, thus other parameters can be queried as well:
+#
+#     key IN (SELECT key FROM params WHERE name = 'A1' AND value < 0.1)
+#
+# Catalog is refreshed before each query. Only the database modules
+# and tables whose files, or the generator modules they use, are
+# modified since the last refresh are loaded again.
+#
+
+import os, sys, json, sqlite3, importlib, numbers
+from e3dmg import dbutils
+from e3dmg.cache import moduleDependencies, moduleFile, sourceFiles, \
+    generatorInstance, encodeValue
+from e3dmg.distribute import componentKey
+
+# common dimensions, columns of `components` table
+DIMENSIONS = [('pins', 'INTEGER'), ('pitch', 'REAL'), ('length', 'REAL'),
+              ('width', 'REAL'), ('height', 'REAL')]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    key TEXT PRIMARY KEY, module TEXT, name TEXT, generator TEXT, %s);
+CREATE INDEX IF NOT EXISTS components_module ON components (module);
+%s
+CREATE TABLE IF NOT EXISTS params (key TEXT, name TEXT, value);
+CREATE INDEX IF NOT EXISTS params_key ON params (key);
+CREATE INDEX IF NOT EXISTS params_name_value ON params (name, value);
+CREATE TABLE IF NOT EXISTS sources (module TEXT, file TEXT, mtime REAL);
+CREATE INDEX IF NOT EXISTS sources_module ON sources (module);
+""" % (", ".join("%s %s" % d for d in DIMENSIONS),
+       "\n".join("CREATE INDEX IF NOT EXISTS components_%s ON components (%s);" %
+                 (d, d) for d, t in DIMENSIONS))
+
+def databaseFiles(package='e3dmg.database'):
+    """Returns a dictionary of module path: file name of the python
+    modules and tables of the database, without importing them."""
+    pkg = importlib.import_module(package)
+    files = {}
+    for root in pkg.__path__:
+        for dirpath, dirnames, filenames in os.walk(root):
+            # only descend into packages
+            dirnames[:] = sorted(d for d in dirnames
+                                 if os.path.exists(os.path.join(dirpath, d, '__init__.py')))
+            rel = os.path.relpath(dirpath, root)
+            prefix = package if rel == '.' else package + '.' + rel.replace(os.sep, '.')
+            for fname in filenames:
+                base, ext = os.path.splitext(fname)
+                if ext == '.py' and base != '__init__':
+                    files[prefix + '.' + base] = os.path.join(dirpath, fname)
+    files.update(dbutils.findTables(pkg))
+    return files
+
+def databaseEntries(mpath, filename):
+    """Returns database entries of a python module or table."""
+    if os.path.splitext(filename)[1] in dbutils.TABLE_EXTENSIONS:
+        return dbutils.loadTable(filename, mpath).entries()
+    return list(dbutils.moduleEntries(importlib.import_module(mpath)))
+
+def paramValue(value):
+    """Returns a SQLite value of a generator parameter."""
+    if isinstance(value, bool):
+        return int(value)
+    if value is None or isinstance(value, numbers.Number):
+        return value
+    if isinstance(value, (str, type(u''))):
+        return value
+    return json.dumps(value, default=encodeValue)
+
+def getmtime(filename):
+    try:
+        return os.path.getmtime(filename)
+    except OSError:
+        return None
+
+class Catalog(object):
+    """SQLite catalog of the database.
+
+    `filename` : catalog file, created if it doesn't exist
+    """
+
+    def __init__(self, filename):
+        self.db = sqlite3.connect(filename)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _remove(self, module):
+        db = self.db
+        db.execute("DELETE FROM params WHERE key IN "
+                   "(SELECT key FROM components WHERE module = ?)", (module,))
+        db.execute("DELETE FROM components WHERE module = ?", (module,))
+        db.execute("DELETE FROM sources WHERE module = ?", (module,))
+
+    def _index(self, mpath, filename):
+        """Adds entries of a database module. Returns their count."""
+        module = mpath[len('e3dmg.database.'):]
+        entries = databaseEntries(mpath, filename)
+        files = set([filename])
+        if mpath in sys.modules:
+            files.update(moduleFile(m) for m in moduleDependencies(sys.modules[mpath]))
+
+        classes = set()
+        components, params = [], []
+        for entry in entries:
+            key = componentKey(entry)
+            try:
+                generator = generatorInstance(entry['generator'])
+                dimensions = generator.dimensions()
+                cls = type(generator)
+                classes.add(cls)
+                clsPath = "%s.%s" % (cls.__module__, cls.__name__)
+                values = vars(generator)
+            except Exception: # ex: invalid table row, build reports it
+                g = entry['generator']
+                if isinstance(g, dbutils.LazyGenerator):
+                    clsPath, values = g.generatorPath, g.params
+                else:
+                    clsPath = "%s.%s" % (type(g).__module__, type(g).__name__)
+                    values = vars(g)
+                dimensions = {}
+            components.append([key, module, entry['name'], clsPath] +
+                              [dimensions.get(d) for d, t in DIMENSIONS])
+            params += [(key, name, paramValue(value))
+                       for name, value in sorted(values.items())
+                       if not name.startswith('_')]
+        for cls in classes:
+            files.update(sourceFiles(cls))
+        files.discard(None)
+
+        db = self.db
+        db.executemany("INSERT OR REPLACE INTO components VALUES (%s)" %
+                       ",".join("?" * (4 + len(DIMENSIONS))), components)
+        db.executemany("INSERT INTO params VALUES (?, ?, ?)", params)
+        db.executemany("INSERT INTO sources VALUES (?, ?, ?)",
+                       [(module, os.path.abspath(f), getmtime(f)) for f in files])
+        return len(entries)
+
+    def refresh(self, package='e3dmg.database'):
+        """Indexes database modules that are new or modified since the
+        last refresh and removes deleted ones. Returns the number of
+        (re)indexed entries."""
+        files = databaseFiles(package)
+        modules = dict((m[len('e3dmg.database.'):], m) for m in files)
+        sources = {}
+        for module, filename, mtime in self.db.execute(
+                "SELECT module, file, mtime FROM sources"):
+            sources.setdefault(module, []).append((filename, mtime))
+
+        count = 0
+        with self.db:
+            for module in set(sources) - set(modules):
+                self._remove(module)
+            for module, mpath in sorted(modules.items()):
+                if module in sources and \
+                   all(getmtime(f) == mtime for f, mtime in sources[module]):
+                    continue
+                self._remove(module)
+                try:
+                    count += self._index(mpath, files[mpath])
+                except Exception as e:
+                    print("Couldn't add %s to catalog: %s" % (module, e))
+        return count
+
+    def query(self, condition):
+        """Returns a list of (module, name) of components that satisfy
+        a SQL condition on `components` table."""
+        return list(self.db.execute("SELECT module, name FROM components WHERE %s "
+                                    "ORDER BY key" % condition))
@@ -31,15 +31,69 @@ class Material(object):
         self.emissiveColor = emissiveColor
         self.transparency = transparency
 
+class Deferred(object):
+    """A value that is built by calling `builder` when it's first
+    needed. Result is kept, so it's built only once. Call the object
+    to get the value.
+
+    Use it for costly parts of a model that may not be exported, see
+    `ComponentModel.addPart`.
+    """
+    def __init__(self, builder):
+        self.builder = builder
+        self.built = False
+        self.value = None
+
+    def __call__(self):
+        if not self.built:
+            self.value = self.builder()
+            self.built = True
+            self.builder = None # release objects referenced by builder
+        return self.value
+
 class ComponentModel(object):
 
     def __init__(self):
-        # list of tuples: (cqobject, part_color, part_name)
-        self.parts = []
+        # list of tuples: (cqobject or Deferred, part_color, part_name)
+        self._parts = []
 
     def addPart(self, cqobject, color, name=None):
-        """Add a cqobject as part of this ComponentModel."""
-        self.parts.append((cqobject, color, name))
+        """Add a cqobject as part of this ComponentModel.
+
+        `cqobject` can also be a function or a `Deferred` that returns
+        the cqobject. It's called when the part is first accessed and
+        the result is kept. Parts that aren't exported are never built,
+        see `select`.
+        """
+        if callable(cqobject) and not isinstance(cqobject, Deferred):
+            cqobject = Deferred(cqobject)
+        self._parts.append((cqobject, color, name))
+
+    @property
+    def parts(self):
+        """List of (cqobject, part_color, part_name) tuples, deferred
+        parts are built."""
+        return [(o() if isinstance(o, Deferred) else o, color, name)
+                for o, color, name in self._parts]
+
+    def builtParts(self):
+        """List of (cqobject, part_color, part_name) tuples without
+        building deferred parts, cqobject is `None` for the parts that
+        aren't built yet."""
+        return [((o() if o.built else None) if isinstance(o, Deferred) else o,
+                 color, name) for o, color, name in self._parts]
+
+    def partNames(self):
+        """Returns names of the parts without building them."""
+        return [name for o, color, name in self._parts]
+
+    def select(self, names):
+        """Returns a new ComponentModel that contains only the parts
+        with given names. Deferred parts are not built, but they are
+        shared with this model so they are built only once."""
+        model = ComponentModel()
+        model._parts = [p for p in self._parts if p[2] in names]
+        return model
 
     def show(self):
         """Displays the model using cadquery helper functions. These functions
@@ -23,6 +23,7 @@
 #
 
 from e3dmg.generators.box import BoxGen
+from e3dmg.sweep import Sweep
 from e3dmg import Material
 
 red = (1.,0.,0.)
@@ -39,3 +40,11 @@ cube10x10x10 = BoxGen(10,10,10,green)
 cube15x15x15 = BoxGen(15,15,15,blue)
 
 chrome_cube = BoxGen(5,5,5,chrome)
+
+# a family of boxes, creates `box5x5x1`, `box10x5x1` etc.
+boxes = Sweep(BoxGen, "box{l}x{w}x{h}",
+              dict(l = [5, 10, 15],
+                   w = [5, 10, 15],
+                   h = [1, 2],
+                   color = blue),
+              constraints = [lambda p: p['l'] >= p['w']])
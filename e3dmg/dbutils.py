@@ -18,8 +18,252 @@
 # along with ecad-3d-model-generator.  If not, see
 # <http://www.gnu.org/licenses/>.
 
-import importlib, pkgutil, os, inspect
+import importlib, pkgutil, os, inspect, csv, json, ast, re
 from e3dmg import Generator
+from e3dmg.sweep import Sweep
+
+#
+# Besides python modules, database can contain tabular files (CSV or
+# JSON). Each row of a table describes a component with a generator
+# class and its constructor parameters. A table file `qfp/more.csv`
+# is accessed as module `qfp.more` just like a python module, table
+# files must be in a package directory.
+#
+# CSV tables must have a header row with `name` and `generator`
+# columns, other columns are parameters of the generator. Cells are
+# parsed as python literals (`0.5`, `(5.0, 5.0)`, `None`), empty cells
+# are skipped so that default value of the parameter is used. Lines
+# starting with `#` are comments.
+#
+#     name,generator,D,E,D1,E1,A1,A2,b,e,npx,npy,epad
+#     QFP32_5x5_P05,qfp.QFPGen,7.0,7.0,5.0,5.0,0.1,1.0,0.22,0.5,8,8,None
+#
+# JSON tables contain an object with a `components` list. A default
+# `generator` can be given at top level:
+#
+#     {"generator": "qfn.QFNGen",
+#      "components": [{"name": "QFN16_3x3_NG", "D": 3.0, ...}]}
+#
+# Generator class paths are relative to `e3dmg.generators` package
+# unless they start with `e3dmg.`.
+#
+
+TABLE_EXTENSIONS = ['.csv', '.json']
+
+class LazyGenerator(Generator):
+    """A generator defined by a database table row. Generator class is
+    imported and instantiated only when it's first needed. Attributes
+    of the actual generator object are accessible through this object.
+    """
+
+    _instance = None
+
+    def __init__(self, generatorPath, params):
+        self.generatorPath = generatorPath
+        self.params = params
+
+    def instance(self):
+        """Returns the actual generator object."""
+        if self._instance is None:
+            cls = getGeneratorClass(self.generatorPath)
+            errors = checkParams(cls, self.params)
+            if errors:
+                raise Exception("Invalid parameters for %s: %s" %
+                                (self.generatorPath, ", ".join(errors)))
+            self._instance = cls(**self.params)
+        return self._instance
+
+    def generate(self):
+        return self.instance().generate()
+
+    def check(self):
+        try:
+            generator = self.instance()
+        except Exception as e:
+            return [str(e)]
+        return generator.check()
+
+    def dimensions(self):
+        return self.instance().dimensions()
+
+    def __getattr__(self, name):
+        # called only if attribute isn't found in this object
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.instance(), name)
+
+_classes = {}
+
+def getGeneratorClass(path):
+    """Imports and returns a generator class from its path. Path is in
+    the form of `module.Class` or `module:Class`."""
+    if not path in _classes:
+        if ':' in path:
+            module, name = path.split(':')
+        else:
+            module, _, name = path.rpartition('.')
+        if not module.startswith('e3dmg.'):
+            module = 'e3dmg.generators.' + module
+        cls = getattr(importlib.import_module(module), name)
+        if not (inspect.isclass(cls) and issubclass(cls, Generator)):
+            raise Exception("%s is not a generator class!" % path)
+        _classes[path] = cls
+    return _classes[path]
+
+def checkParams(cls, params):
+    """Checks given parameters against constructor signature of a
+    generator class. Returns a list of error messages."""
+    if cls.__init__ is object.__init__:
+        return ["unknown parameter '%s'" % k for k in sorted(params)]
+    try:
+        spec = inspect.getfullargspec(cls.__init__)
+        varkw = spec.varkw
+    except AttributeError: # python 2
+        spec = inspect.getargspec(cls.__init__)
+        varkw = spec.keywords
+    args = spec.args[1:] # skip self
+    required = args[:len(args)-len(spec.defaults or ())]
+    errors = ["missing parameter '%s'" % a for a in required if not a in params]
+    if not varkw:
+        errors += ["unknown parameter '%s'" % k for k in sorted(params) if not k in args]
+    return errors
+
+def parseValue(text):
+    """Parses a table cell. Python literals are evaluated, anything else
+    is returned as a string."""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def tuplify(value):
+    """Converts JSON lists to tuples recursively."""
+    if isinstance(value, list):
+        return tuple(tuplify(v) for v in value)
+    return value
+
+def readCSV(filename):
+    """Returns rows of a CSV table as a list of (line, row dict)."""
+    rows = []
+    with open(filename) as f:
+        lines = [(i+1, l) for i, l in enumerate(f)
+                 if l.strip() and not l.lstrip().startswith('#')]
+    if not lines:
+        return rows
+    header = [h.strip() for h in next(csv.reader([lines[0][1]]))]
+    for (lineno, l), cells in zip(lines[1:], csv.reader([l for n, l in lines[1:]])):
+        if len(cells) != len(header):
+            raise Exception("%s:%d: expected %d columns, found %d" %
+                            (filename, lineno, len(header), len(cells)))
+        row = {}
+        for key, cell in zip(header, cells):
+            cell = cell.strip()
+            if cell:
+                row[key] = cell if key in ('name', 'generator') else parseValue(cell)
+        rows.append((lineno, row))
+    return rows
+
+def readJSON(filename):
+    """Returns rows of a JSON table as a list of (index, row dict)."""
+    with open(filename) as f:
+        doc = json.load(f)
+    default = doc.get('generator')
+    rows = []
+    for i, c in enumerate(doc['components']):
+        row = dict((str(k), tuplify(v)) for k, v in c.items())
+        if default and not 'generator' in row:
+            row['generator'] = default
+        for key in ('name', 'generator'):
+            if key in row:
+                row[key] = str(row[key])
+        rows.append((i, row))
+    return rows
+
+class GeneratorTable(object):
+    """A tabular database file. All rows are parsed and their names are
+    checked when the table is loaded, generators are instantiated
+    lazily. Parameters of rows are checked against their generator
+    classes by `LazyGenerator.check`, thus by preflight checks of a
+    build or `--validate`."""
+
+    def __init__(self, filename, package):
+        self.filename = filename
+        self.package = package # module path of the table
+        ext = os.path.splitext(filename)[1]
+        rows = readCSV(filename) if ext == '.csv' else readJSON(filename)
+
+        self.names = []
+        self.generators = {}
+        errors = []
+        for pos, row in rows:
+            name = row.pop('name', None)
+            generator = row.pop('generator', None)
+            if not name or not re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', name):
+                errors.append("%s: invalid component name %r" % (pos, name))
+            elif name in self.generators:
+                errors.append("%s: duplicate component name %s" % (pos, name))
+            elif not generator:
+                errors.append("%s: generator of %s is not given" % (pos, name))
+            else:
+                self.names.append(name)
+                self.generators[name] = LazyGenerator(generator, row)
+        if errors:
+            raise Exception("Errors in database table %s:\n  %s" %
+                            (filename, "\n  ".join(errors)))
+
+    def entries(self):
+        """Returns a list of database entries of this table."""
+        return [dict(package=self.package, name=name, generator=self.generators[name])
+                for name in self.names]
+
+_tables = {}
+
+def loadTable(filename, package):
+    """Loads a table file, tables are cached until they are modified."""
+    mtime = os.path.getmtime(filename)
+    cached = _tables.get(filename)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, GeneratorTable(filename, package))
+        _tables[filename] = cached
+    return cached[1]
+
+def findTable(mpath):
+    """Returns the table file for given module path or `None`."""
+    parent, _, base = mpath.rpartition('.')
+    if not parent:
+        return None
+    try:
+        package = importlib.import_module(parent)
+    except ImportError:
+        return None
+    for d in getattr(package, '__path__', []):
+        for ext in TABLE_EXTENSIONS:
+            fname = os.path.join(d, base + ext)
+            if os.path.exists(fname):
+                return fname
+    return None
+
+def findTables(package):
+    """Returns a list of (module path, filename) of tables in given
+    package and its sub packages."""
+    r = []
+    for root in package.__path__:
+        for dirpath, dirnames, filenames in os.walk(root):
+            # only descend into packages
+            dirnames[:] = sorted(d for d in dirnames
+                                 if os.path.exists(os.path.join(dirpath, d, '__init__.py')))
+            rel = os.path.relpath(dirpath, root)
+            prefix = package.__name__
+            if rel != '.':
+                prefix += '.' + rel.replace(os.sep, '.')
+            for fname in sorted(filenames):
+                base, ext = os.path.splitext(fname)
+                if ext in TABLE_EXTENSIONS:
+                    if base + '.py' in filenames:
+                        raise Exception("Table %s conflicts with module %s.py!" %
+                                        (os.path.join(dirpath, fname), base))
+                    r.append((prefix + '.' + base, os.path.join(dirpath, fname)))
+    return r
 
 def getGenerator(module, name):
     """Returns a single generator from the database.
@@ -27,8 +271,22 @@ def getGenerator(module, name):
     `module` : module path of the generator, ex: `qfp.tqfp`
     `name` : name of the generator, ex: `TQFP64`
     """
-    mod = importlib.import_module(module)
-    generator = getattr(mod, name)
+    table = findTable(module)
+    if table:
+        generators = loadTable(table, module).generators
+        if not name in generators:
+            raise Exception("%s:%s doesn't exist!" % (module, name))
+        generator = generators[name]
+    else:
+        mod = importlib.import_module(module)
+        generator = getattr(mod, name, None)
+        if generator is None: # look into sweeps
+            for obj in list(mod.__dict__.values()):
+                if isinstance(obj, Sweep):
+                    generator = obj.get(name)
+                    if generator: break
+            else:
+                raise Exception("%s:%s doesn't exist!" % (module, name))
     if isinstance(generator, Generator):
         return {'name':name, 'package':module, 'generator':generator}
     else:
@@ -44,13 +302,28 @@ def onImportError(name):
 def isPackage(module):
     return '__init__' in inspect.getfile(module)
 
-def getAllAt(mpath):
-    """Returns a list of generators in given module path.
+def moduleEntries(module):
+    """Yields generators of a python module including sweep variants."""
+    for name, obj in list(module.__dict__.items()):
+        if isinstance(obj, Generator):
+            yield dict(package=module.__name__, name=name, generator=obj)
+        elif isinstance(obj, Sweep):
+            for vname, generator in obj:
+                yield dict(package=module.__name__, name=vname, generator=generator)
+
+def iterAllAt(mpath):
+    """Yields generators in given module path. Unlike `getAllAt`
+    generators of sweeps are created one by one as they are consumed.
 
-    `mpath` : module or package path, ex: 'e3dmg.database.qfp.lqfp'
+    `mpath` : module, package or table path, ex: 'e3dmg.database.qfp.lqfp'
     """
+    table = findTable(mpath)
+    if table:
+        for entry in loadTable(table, mpath).entries():
+            yield entry
+        return
+
     module = importlib.import_module(mpath)
-    r = []
     if isPackage(module):
         wp = pkgutil.walk_packages([mpath.replace('.', '/')],
                                    prefix=mpath+'.',
@@ -59,13 +332,20 @@ def getAllAt(mpath):
         for importer, modname, ispkg in wp:
             if not ispkg:
                 smodule = importlib.import_module(modname)
-                for name, obj in smodule.__dict__.iteritems():
-                    if isinstance(obj, Generator):
-                        r.append(dict(package=modname, name=name, generator=obj))
+                for entry in moduleEntries(smodule):
+                    yield entry
+
+        for tpath, fname in findTables(module):
+            for entry in loadTable(fname, tpath).entries():
+                yield entry
 
     else:
-        for name, obj in module.__dict__.iteritems():
-            if isinstance(obj, Generator):
-                r.append(dict(package=mpath, name=name, generator=obj))
+        for entry in moduleEntries(module):
+            yield entry
 
-    return r
+def getAllAt(mpath):
+    """Returns a list of generators in given module path.
+
+    `mpath` : module, package or table path, ex: 'e3dmg.database.qfp.lqfp'
+    """
+    return list(iterAllAt(mpath))
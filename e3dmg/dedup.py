@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Detection of duplicate models. Different database entries may
+# generate identical geometry. A fingerprint is computed from the
+# geometry and colors of each generated model, and outputs of models
+# are registered by their fingerprint in OUTDIR/.models. When a model
+# matches an earlier one, its outputs are created as hard links
+# (or archive index aliases) of the earlier outputs instead of being
+# exported again.
+#
+# Registry has a JSON file for each fingerprint and output kind (file
+# type and options), thus machines and processes sharing an output
+# directory can use it concurrently.
+#
+
+import os, json, hashlib
+from e3dmg.distribute import makedirs, writeAtomic
+from e3dmg.exporters.export_vrml import colorKey
+
+def formatNumber(x, decimals):
+    s = "%.*f" % (decimals, x)
+    if float(s) == 0: # don't distinguish -0 from 0
+        s = s.lstrip('-')
+    return s
+
+def shapeSignature(shape, decimals=4):
+    """Returns a canonical description of a FreeCAD shape's geometry:
+    topology counts, volume, area and sorted vertex coordinates."""
+    points = sorted(' '.join(formatNumber(c, decimals) for c in (v.X, v.Y, v.Z))
+                    for v in shape.Vertexes)
+    return [len(shape.Solids), len(shape.Faces), len(shape.Edges),
+            formatNumber(shape.Volume, decimals-1),
+            formatNumber(shape.Area, decimals-1), points]
+
+def modelFingerprint(model):
+    """Returns a fingerprint of a ComponentModel, models with identical
+    part geometries and colors have the same fingerprint."""
+    signature = [[shapeSignature(cqobject.toFreecad()), colorKey(color)]
+                 for cqobject, color, name in model.parts]
+    return hashlib.sha1(json.dumps(signature).encode('utf-8')).hexdigest()
+
+class ModelRegistry(object):
+    """Registry of outputs by model fingerprint.
+
+    `outdir` : output directory, registry is kept in its '.models' sub
+               directory
+    `output` : output backend, used to verify registered outputs
+    """
+
+    def __init__(self, outdir, output):
+        self.path = os.path.join(outdir, '.models')
+        self.output = output
+        makedirs(self.path)
+
+    def _file(self, fingerprint, ftype, options):
+        kind = json.dumps([ftype, options], sort_keys=True)
+        return os.path.join(self.path, "%s-%s.json" % (
+            fingerprint, hashlib.sha1(kind.encode('utf-8')).hexdigest()[:12]))
+
+    def lookup(self, fingerprint, ftype, options, component):
+        """Returns the record of an intact earlier output of a different
+        component with the same fingerprint, or `None`."""
+        try:
+            with open(self._file(fingerprint, ftype, options)) as f:
+                r = json.load(f)
+            if r['component'] == component:
+                return None
+            if self.output.hash(r['location']) != r['sha1']:
+                return None # replaced or corrupted since
+            return r
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def add(self, fingerprint, component, ftype, options, location, sha1, size):
+        """Registers an output. An existing record isn't replaced."""
+        filename = self._file(fingerprint, ftype, options)
+        if not os.path.exists(filename):
+            writeAtomic(filename, json.dumps(
+                {'component': component, 'format': ftype, 'options': options,
+                 'location': location, 'sha1': sha1, 'size': size},
+                sort_keys=True))
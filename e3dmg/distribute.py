@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Utilities for distributing a build over several machines.
+#
+# Static sharding splits the component list into N parts by hashing
+# component names, every machine builds its own shard.
+#
+# `WorkQueue` lets any number of machines pull components from a work
+# queue in a shared directory. A component is claimed by creating a
+# lease file, finished components are marked with a done file. Leases
+# are renewed periodically while components are being built and
+# expire after some time without renewal, so that components claimed
+# by a crashed machine are picked up again by others.
+#
+
+import os, time, errno, hashlib, socket, json, threading
+from contextlib import contextmanager
+
+def componentKey(entry):
+    """Returns a unique key of a database entry, ex: 'qfp.jedec:AKA'."""
+    return "%s:%s" % (entry['package'][len('e3dmg.database.'):], entry['name'])
+
+def shardOf(key, count):
+    """Returns the shard index (0 based) of a key. Unlike `hash` the
+    result is the same for every run and machine."""
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest(), 16) % count
+
+def parseShard(text):
+    """Parses a shard argument in the form of 'i/N' where `i` is from 1
+    to N. Returns a tuple of 0 based index and shard count."""
+    try:
+        i, n = [int(s) for s in text.split('/')]
+    except ValueError:
+        raise Exception("Invalid shard '%s', must be in the form of i/N" % text)
+    if not 1 <= i <= n:
+        raise Exception("Invalid shard '%s', i must be from 1 to N" % text)
+    return i-1, n
+
+def inShard(entries, index, count):
+    """Yields database entries that belong to given shard."""
+    for entry in entries:
+        if shardOf(componentKey(entry), count) == index:
+            yield entry
+
+def makedirs(path):
+    """Creates a directory, doesn't fail if it's created concurrently."""
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST or not os.path.isdir(path):
+            raise
+
+def writeAtomic(path, data):
+    """Writes data to a file through a temporary file, file appears with
+    complete content or doesn't appear at all."""
+    tmp = "%s.%s-%d.tmp" % (path, socket.gethostname(), os.getpid())
+    with open(tmp, 'w') as f:
+        f.write(data)
+    os.rename(tmp, path)
+
+@contextmanager
+def fileLock(lockfile, timeout=60):
+    """Acquires a lock by creating a lock file, works on shared
+    directories. A lock older than `timeout` seconds is considered
+    stale and broken."""
+    while True:
+        try:
+            fd = os.open(lockfile, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            break
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            try:
+                if time.time() - os.path.getmtime(lockfile) > timeout:
+                    os.remove(lockfile)
+                    continue
+            except OSError: # removed by its owner meanwhile
+                continue
+            time.sleep(0.1)
+    try:
+        yield
+    finally:
+        os.remove(lockfile)
+
+class WorkQueue(object):
+    """A work queue in a shared directory.
+
+    `path` : queue directory, shared by all machines
+    `lease` : lease duration in seconds, a claimed component whose
+              lease isn't renewed in this time can be claimed by
+              another machine, see `startRenewal`
+    `poll` : waiting period in seconds before re-checking components
+             that are claimed by other machines
+    """
+
+    def __init__(self, path, lease=3600, poll=10):
+        self.path = path
+        self.lease = lease
+        self.poll = poll
+        self.owner = "%s-%d" % (socket.gethostname(), os.getpid())
+        self.held = set() # keys of claimed, not finished components
+        self.heldLock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        for d in ['leases', 'done']:
+            makedirs(os.path.join(path, d))
+
+    def _file(self, kind, key):
+        return os.path.join(self.path, kind, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def lock(self, timeout=60):
+        """Acquires the global lock of the queue, see `fileLock`."""
+        return fileLock(os.path.join(self.path, 'lock'), timeout)
+
+    def _writeLease(self, fd, key):
+        os.write(fd, json.dumps({'key': key, 'owner': self.owner,
+                                 'time': time.time()}).encode('utf-8'))
+        os.close(fd)
+
+    def _leaseOwner(self, leasefile):
+        try:
+            with open(leasefile) as f:
+                return json.load(f)['owner']
+        except (IOError, OSError, ValueError):
+            return None
+
+    def isDone(self, key):
+        return os.path.exists(self._file('done', key))
+
+    def claim(self, key):
+        """Tries to claim a component. Returns `True` if the component is
+        claimed for this worker."""
+        if self.isDone(key):
+            return False
+        leasefile = self._file('leases', key)
+        try:
+            self._writeLease(os.open(leasefile, os.O_CREAT | os.O_EXCL | os.O_WRONLY), key)
+            self._hold(key)
+            return True
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        # already leased, take it over if lease is expired
+        with self.lock():
+            try:
+                expired = time.time() - os.path.getmtime(leasefile) > self.lease
+            except OSError: # lease is released meanwhile
+                expired = True
+            if not expired or self.isDone(key) or self._leaseOwner(leasefile) == self.owner:
+                return False
+            tmp = leasefile + '.' + self.owner
+            self._writeLease(os.open(tmp, os.O_CREAT | os.O_TRUNC | os.O_WRONLY), key)
+            os.rename(tmp, leasefile)
+            self._hold(key)
+            return True
+
+    def _hold(self, key):
+        with self.heldLock:
+            self.held.add(key)
+
+    def renew(self, key):
+        """Extends the lease of a claimed component. Returns `False` if
+        the lease is finished or taken over by another machine."""
+        leasefile = self._file('leases', key)
+        if self._leaseOwner(leasefile) != self.owner:
+            return False
+        try:
+            os.utime(leasefile, None)
+        except OSError: # finished meanwhile
+            return False
+        return True
+
+    def _renewLeases(self):
+        while not self.stopped.wait(self.lease / 4.):
+            with self.heldLock:
+                keys = list(self.held)
+            for key in keys:
+                if not self.renew(key):
+                    with self.heldLock:
+                        self.held.discard(key)
+
+    def startRenewal(self):
+        """Starts renewing leases of claimed components in a background
+        thread, so that builds taking longer than the lease duration
+        aren't taken over by other machines."""
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._renewLeases)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stopRenewal(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def done(self, key, failed=False):
+        """Marks a claimed component as finished. Failed components are
+        also finished, they are not retried by other workers."""
+        writeAtomic(self._file('done', key),
+                    json.dumps({'key': key, 'owner': self.owner,
+                                'failed': failed, 'time': time.time()}))
+        with self.heldLock:
+            self.held.discard(key)
+        try:
+            os.remove(self._file('leases', key))
+        except OSError:
+            pass
+
+    def claimed(self, entries):
+        """Yields database entries that are claimed for this worker.
+        Caller must mark each yielded entry as done with `done()`.
+
+        After all entries are seen, it keeps waiting for the components
+        claimed by other workers; if their leases expire they are
+        claimed and yielded. While this worker holds unfinished
+        components it doesn't wait, `None` is yielded instead so that
+        the caller can finish them first: others may be waiting for
+        them.
+        """
+        pending = []
+        for entry in entries:
+            key = componentKey(entry)
+            if self.claim(key):
+                yield entry
+            elif not self.isDone(key):
+                pending.append(entry)
+
+        checked = time.time()
+        while pending:
+            wait = checked + self.poll - time.time()
+            if wait > 0:
+                if self.held:
+                    yield None
+                    continue
+                time.sleep(wait)
+            checked = time.time()
+            waiting = []
+            for entry in pending:
+                key = componentKey(entry)
+                if self.claim(key):
+                    yield entry
+                elif not self.isDone(key):
+                    waiting.append(entry)
+            pending = waiting
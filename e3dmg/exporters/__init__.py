@@ -24,4 +24,4 @@
 # functionality. This may have some unknown (yet) side effects.
 #
 
-from e3dmg.exporters.export import export
+from e3dmg.exporters.export import export, exportScales
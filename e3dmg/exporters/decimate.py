@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Level of detail (LOD) variants of tessellated meshes.
+#
+# Meshes are reduced with vertex clustering: vertices are snapped to a
+# regular grid, vertices in the same cell are merged to their average
+# and triangles that collapse are dropped. Grid resolution is searched
+# to get close to a target triangle count. It's crude compared to edge
+# collapse methods but fast, needs no dependencies and works well
+# enough for the boxy shapes of electronic components.
+#
+
+from collections import namedtuple
+from e3dmg.exporters.export_x3d import Mesh
+
+# a vertex of a reduced mesh, formatted like a FreeCAD `Vector`
+Point = namedtuple('Point', ['x', 'y', 'z'])
+
+# names of LOD levels, from the most detailed to the least
+LEVELS = ['full', 'reduced', 'box']
+
+# triangles of a box with corner indexes as bits of (x, y, z)
+BOX_FACES = [(0, 2, 3), (0, 3, 1), (4, 5, 7), (4, 7, 6),
+             (0, 1, 5), (0, 5, 4), (2, 6, 7), (2, 7, 3),
+             (0, 4, 6), (0, 6, 2), (1, 3, 7), (1, 7, 5)]
+
+def boundingBox(points):
+    """Returns ((xmin, ymin, zmin), (xmax, ymax, zmax)) of points."""
+    xs = [p.x for p in points]
+    ys = [p.y for p in points]
+    zs = [p.z for p in points]
+    return (min(xs), min(ys), min(zs)), (max(xs), max(ys), max(zs))
+
+def clusterMesh(mesh, bbox, resolution):
+    """Merges the vertices of `mesh` in a grid of `resolution` cells
+    along the longest side of `bbox`. Returns a new `Mesh`."""
+    (x0, y0, z0), (x1, y1, z1) = bbox
+    k = resolution / (max(x1-x0, y1-y0, z1-z0) or 1.)
+
+    cells = {}
+    index = []
+    for p in mesh.points:
+        key = (int((p.x-x0)*k), int((p.y-y0)*k), int((p.z-z0)*k))
+        index.append(cells.setdefault(key, len(cells)))
+
+    faces = []
+    seen = set()
+    for a, b, c in mesh.faces:
+        a, b, c = index[a], index[b], index[c]
+        if a == b or b == c or a == c:
+            continue
+        key = tuple(sorted((a, b, c)))
+        if key in seen:
+            continue
+        seen.add(key)
+        faces.append((a, b, c))
+
+    # average vertices of each cell, keep only the referenced cells
+    sums = [[0., 0., 0., 0] for i in range(len(cells))]
+    for p, i in zip(mesh.points, index):
+        s = sums[i]
+        s[0] += p.x; s[1] += p.y; s[2] += p.z; s[3] += 1
+    used = {}
+    for face in faces:
+        for i in face:
+            used.setdefault(i, len(used))
+    points = [None] * len(used)
+    for i, j in used.items():
+        x, y, z, n = sums[i]
+        points[j] = Point(x/n, y/n, z/n)
+    faces = [(used[a], used[b], used[c]) for a, b, c in faces]
+
+    return Mesh(points=points, faces=faces, color=mesh.color)
+
+def decimateMesh(mesh, ratio):
+    """Returns a reduced copy of `mesh` with about `ratio` of its
+    triangles. `mesh` is returned as is if it can't be reduced."""
+    if ratio >= 1 or len(mesh.faces) <= len(BOX_FACES):
+        return mesh
+    target = max(1, int(len(mesh.faces) * ratio))
+    bbox = boundingBox(mesh.points)
+
+    # find the finest grid that doesn't exceed the target
+    results = {}
+    def reduced(resolution):
+        if not resolution in results:
+            results[resolution] = clusterMesh(mesh, bbox, resolution)
+        return results[resolution]
+
+    lo, hi = 1, 2
+    while len(reduced(hi).faces) <= target:
+        if hi >= 2**16: # can't reduce, ex: too many tiny triangles
+            return mesh
+        lo, hi = hi, hi*2
+    # a few percent of resolution is close enough
+    while hi - lo > max(1, lo // 32):
+        mid = (lo + hi) // 2
+        if len(reduced(mid).faces) <= target:
+            lo = mid
+        else:
+            hi = mid
+
+    best = reduced(lo)
+    if not best.faces: # collapsed completely, rather exceed the target
+        best = reduced(hi)
+    return best
+
+def boxMesh(mesh):
+    """Returns the bounding box of `mesh` as a `Mesh` of the same
+    color, `None` if mesh is empty."""
+    if not mesh.points:
+        return None
+    bbox = boundingBox(mesh.points)
+    points = [Point(bbox[i & 1][0], bbox[(i >> 1) & 1][1], bbox[(i >> 2) & 1][2])
+              for i in range(8)]
+    return Mesh(points=points, faces=list(BOX_FACES), color=mesh.color)
+
+def lodLevels(meshes, ratio):
+    """Returns LOD levels of given list of `Mesh` objects: the meshes
+    themselves, reduced meshes with `ratio` of triangles and bounding
+    box proxies. Each level is a list of `Mesh`, colors are kept."""
+    reduced = [decimateMesh(m, ratio) for m in meshes]
+    boxes = [b for b in (boxMesh(m) for m in meshes) if b is not None]
+    return [meshes, reduced, boxes]
+
+def lodRanges(meshes):
+    """Returns viewing distances to switch between LOD levels of
+    `meshes`, relative to their size."""
+    points = [p for m in meshes for p in m.points]
+    if not points:
+        return [1., 1.]
+    (x0, y0, z0), (x1, y1, z1) = boundingBox(points)
+    size = ((x1-x0)**2 + (y1-y0)**2 + (z1-z0)**2) ** 0.5
+    return [size * 10, size * 50]
@@ -24,20 +24,50 @@
 # initalizes FreeCAD's mainwindow thus enables some GUI
 # functionality. This may have some unknown (yet) side effects.
 #
+# If pythonocc is installed STEP files are exported without the GUI
+# library, see `export_step.py`.
+#
 
 import os
-import FreeCAD, FreeCADGui
-import cadquery as cq
 from e3dmg import Material
 
-def makeFCObject(doc, name, cqobject, color=None):
+# allowed file extensions of exporters that check them
+EXTENSIONS = {
+    "STEP": ['.stp', '.step'],
+    "VRML": ['.wrl', '.vrml'],
+}
+
+def checkExtension(ftype, filename):
+    extensions = EXTENSIONS.get(ftype)
+    if extensions and not os.path.splitext(filename)[1] in extensions:
+        raise Exception("Filename for %s export must end with %s." %
+                        (ftype, " or ".join("'%s'" % e for e in extensions)))
+
+def writeFile(filename, data):
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+def scaleShape(shape, scale):
+    """Returns a copy of the FreeCAD shape scaled with a transformation
+    matrix. Unlike `Draft.scale` no document objects are created."""
+    import FreeCAD
+    matrix = FreeCAD.Matrix()
+    matrix.scale(scale, scale, scale)
+    shape = shape.copy()
+    shape.transformShape(matrix)
+    return shape
+
+def makeFCObject(doc, name, cqobject, color=None, scale=None):
     """Creates an Object in document tree.
     `doc` : FreeCAD document object
     `cqobject` : cadquery object
     `color` : color RGB tuple
+    `scale` : scale factor of the shape
     """
     obj = doc.addObject("Part::Feature", name)
     obj.Shape = cqobject.toFreecad()
+    if scale:
+        obj.Shape = scaleShape(obj.Shape, scale)
     vobj = obj.ViewObject
     if isinstance(color, Material):
         vobj.ShapeColor = color.diffuseColor
@@ -53,7 +83,7 @@ def makeFCObject(doc, name, cqobject, color=None):
     return obj
 
 def shapeToMesh(shape, color, scale=None):
-    from export_x3d import Mesh
+    from e3dmg.exporters.export_x3d import Mesh
     mesh_data = shape.tessellate(1)
     points = mesh_data[0]
     if scale != None:
@@ -71,7 +101,35 @@ def export(ftype, componentName, componentModel, filename, fuse=False, scale=Non
     `fuse` : fuse objects together before export (preserves color)
     `scale` : scales the model with this factor before exporting
 
-    X3D exporter doesn't support `fuse` parameter.
+    Simple VRML exporter doesn't support `fuse` parameter. X3D and
+    VRML files are written without FreeCADGui, STEP files as well when
+    pythonocc is available.
+    """
+    exportScales(ftype, componentName, componentModel, [(filename, scale)], fuse)
+
+def exportScales(ftype, componentName, componentModel, outputs, fuse=False,
+                 write=writeFile, precision=None, triangles=False, lod=None,
+                 trim=False):
+    """Exports given ComponentModel object in several scales. Model is
+    converted, fused and tessellated once, scaling is applied while
+    writing each file.
+
+    `outputs` : list of (filename, scale) tuples, scale can be None.
+                X3D and VRML outputs can be (filename, scale, level)
+                to write only a level of detail, see `lod`.
+    `write` : called as `write(filename, data)` to write serialized
+              X3D and VRML files, ex: to write them in the background.
+              STEP and FreeCAD files are written by their exporters.
+    `precision` : number of decimals of X3D and VRML coordinates,
+                  exporter's default if `None`
+    `triangles` : write X3D meshes as IndexedTriangleSet
+    `trim` : remove trailing zeros of X3D and VRML coordinates
+    `lod` : ratio of triangles of the reduced level of detail. If
+            given, X3D and VRML files contain a LOD node of full,
+            reduced and bounding box levels, unless an output selects
+            a level (0, 1 or 2).
+
+    See `export` for other parameters.
     """
     objects = componentModel.parts
 
@@ -81,22 +139,58 @@ def export(ftype, componentName, componentModel, filename, fuse=False, scale=Non
     if len(objects) == 1: # can't fuse if there is only 1 object
         fuse = False
 
-    # export to X3D or Simple VRML, continue for other exporters (VRML, FREECAD, STEP)
-    if ftype in ["X3D", "S_VRML"]:
-        if fuse: print("%s exporter can't do fuse, ignoring." % ftype)
-
-        from export_x3d import exportX3D, Mesh
-        from export_vrml import exportVRML
-
-        meshes = [shapeToMesh(o[0].toFreecad(), o[1], scale) for o in objects]
-
-        if ftype == "X3D":
-            exportX3D(meshes, filename)
-        else: # S_VRML
-            exportVRML(meshes, filename)
+    for output in outputs:
+        checkExtension(ftype, output[0])
+
+    # options of mesh serializers
+    formatOptions = {'trim': trim}
+    if precision is not None:
+        formatOptions['precision'] = precision
+
+    # export to X3D or (Simple) VRML, continue for other exporters (FREECAD, STEP)
+    if ftype in ["X3D", "S_VRML", "VRML"]:
+        from e3dmg.exporters.export_x3d import serializeX3D
+        from e3dmg.exporters.export_vrml import serializeVRML, shapeMeshes
+
+        # fused models are written as a mesh for each color
+        if ftype == "VRML" or (ftype == "X3D" and fuse):
+            meshes = shapeMeshes([(o[0].toFreecad(), o[1]) for o in objects], fuse)
+        else:
+            if fuse: print("%s exporter can't do fuse, ignoring." % ftype)
+            meshes = [shapeToMesh(o[0].toFreecad(), o[1]) for o in objects]
+
+        levels = ranges = None
+        if lod:
+            from e3dmg.exporters.decimate import lodLevels, lodRanges
+            levels = lodLevels(meshes, lod)
+            ranges = lodRanges(meshes)
+
+        for output in outputs:
+            filename, scale = output[:2]
+            level = output[2] if len(output) > 2 else None
+            if levels is None:
+                content, contentRanges = meshes, None
+            elif level is None:
+                content, contentRanges = levels, ranges
+            else:
+                content, contentRanges = levels[level], None
+
+            if ftype == "X3D":
+                write(filename, serializeX3D(content, scale, triangles=triangles,
+                                             ranges=contentRanges, **formatOptions))
+            else:
+                write(filename, serializeVRML(content, scale, ranges=contentRanges,
+                                              **formatOptions))
+        return
 
+    from e3dmg.exporters import export_step
+    if ftype == "STEP" and export_step.available():
+        parts = [(o[0].toFreecad(), o[1], componentName+"_"+o[2]) for o in objects]
+        export_step.exportSTEP(parts, outputs, fuse, componentName)
         return
 
+    import FreeCAD, FreeCADGui
+
     # init FreeCADGui
     try:
         import ImportGui
@@ -110,11 +204,27 @@ def export(ftype, componentName, componentModel, filename, fuse=False, scale=Non
     usersRSOption = pg.GetBool("RefineModel") # will be restored, we promise
     pg.SetBool("RefineModel", False)
 
-    # create a FreeCAD document
-    doc = FreeCAD.newDocument()
+    try:
+        for filename, scale in outputs:
+            # create a FreeCAD document
+            doc = FreeCAD.newDocument()
+            try:
+                exportDocument(doc, ftype, componentName, objects, filename, fuse, scale)
+            finally:
+                # close the document, otherwise its objects and shapes
+                # are kept in memory until FreeCAD exits
+                FreeCAD.closeDocument(doc.Name)
+    finally:
+        # restore RefineShape option
+        pg.SetBool("RefineModel", usersRSOption)
+
+def exportDocument(doc, ftype, componentName, objects, filename, fuse, scale):
+    """Creates FreeCAD objects of the ComponentModel parts in `doc` and
+    exports them. See `export` for parameters."""
+    import ImportGui
 
     # create objects
-    fcobjects = [makeFCObject(doc, componentName+"_"+co[2], co[0], co[1])
+    fcobjects = [makeFCObject(doc, componentName+"_"+co[2], co[0], co[1], scale)
                  for co in objects]
 
     if fuse:
@@ -125,36 +235,11 @@ def export(ftype, componentName, componentModel, filename, fuse=False, scale=Non
     else:
         exportObjects = fcobjects
 
-    if scale:
-        import Draft
-        v = FreeCAD.Vector(scale, scale, scale)
-        vc = FreeCAD.Vector(0,0,0)
-        # legacy=False, sometimes fail if scale < 1.0
-        exportObjects = [Draft.scale(obj, delta=v, center=vc, legacy=True) for obj in exportObjects]
-
     doc.recompute()
 
     if ftype == "STEP":
-        # check filename
-        if not os.path.splitext(filename)[1] in ['.stp', '.step']:
-            raise Exception("Filename for STEP export must end with '.stp' or '.step'.")
         ImportGui.export(exportObjects, filename)
 
-    elif ftype == "VRML":
-        # check filename
-        if not os.path.splitext(filename)[1] in ['.wrl', '.vrml']:
-            raise Exception("Filename for VRML export must end with '.wrl' or '.vrml'.")
-
-        # workaround for not exporting unselected objects (v0.16)
-        # http://www.freecadweb.org/tracker/view.php?id=2221
-        FreeCADGui.Selection.clearSelection()
-        for o in exportObjects: FreeCADGui.Selection.addSelection(o)
-
-        # deal with points and lines
-        for o in exportObjects: o.ViewObject.DisplayMode = "Shaded"
-
-        FreeCADGui.export(exportObjects, filename)
-
     elif ftype == "FREECAD":
         for obj in list(doc.Objects):
             if not (obj in exportObjects): doc.removeObject(obj.Name)
@@ -162,6 +247,3 @@ def export(ftype, componentName, componentModel, filename, fuse=False, scale=Non
 
     else:
         raise Exception("Unknown export file type!")
-
-    # restore RefineShape option
-    pg.SetBool("RefineModel", usersRSOption)
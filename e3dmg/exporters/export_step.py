@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# This is a STEP exporter that doesn't need FreeCADGui. Shapes are
+# transferred to an OCC XCAF document through pythonocc and written
+# with STEPCAFControl, together with part colors and names. Thus it
+# can run on headless machines and in many processes at once.
+#
+
+import os, tempfile, importlib
+from e3dmg import Material
+from e3dmg.exporters.fuse import fuseShapes
+
+def occModule(name):
+    """Imports a pythonocc module, supports both new (OCC.Core.X) and
+    old (OCC.X) package layouts."""
+    try:
+        return importlib.import_module('OCC.Core.' + name)
+    except ImportError:
+        return importlib.import_module('OCC.' + name)
+
+def available():
+    """Returns True if pythonocc is installed."""
+    try:
+        occModule('STEPCAFControl')
+        return True
+    except ImportError:
+        return False
+
+def toOCC(shape):
+    """Converts a FreeCAD shape to a pythonocc shape."""
+    TopoDS = occModule('TopoDS')
+    BRep = occModule('BRep')
+    BRepTools = occModule('BRepTools')
+
+    fd, filename = tempfile.mkstemp(suffix='.brep')
+    os.close(fd)
+    try:
+        shape.exportBrep(filename)
+        occShape = TopoDS.TopoDS_Shape()
+        BRepTools.breptools_Read(occShape, filename, BRep.BRep_Builder())
+    finally:
+        os.remove(filename)
+    return occShape
+
+def occColor(color):
+    """Returns Quantity_Color for a (R, G, B) tuple or `Material`."""
+    Quantity = occModule('Quantity')
+    if isinstance(color, Material):
+        color = color.diffuseColor
+    return Quantity.Quantity_Color(color[0], color[1], color[2],
+                                   Quantity.Quantity_TOC_RGB)
+
+def scaleOCC(shape, scale):
+    """Returns the pythonocc shape scaled with a transformation matrix."""
+    if not scale or scale == 1:
+        return shape
+    gp = occModule('gp')
+    BRepBuilderAPI = occModule('BRepBuilderAPI')
+    trsf = gp.gp_Trsf()
+    trsf.SetScale(gp.gp_Pnt(0, 0, 0), scale)
+    return BRepBuilderAPI.BRepBuilderAPI_Transform(shape, trsf, True).Shape()
+
+def writeSTEP(items, filename, scale=None):
+    """Writes pythonocc shapes to a STEP file.
+
+    `items` : list of (shape, name, color) tuples, `color` can be a
+              list of colors for each face
+    """
+    TCollection = occModule('TCollection')
+    TDocStd = occModule('TDocStd')
+    TDataStd = occModule('TDataStd')
+    TopExp = occModule('TopExp')
+    TopAbs = occModule('TopAbs')
+    TopTools = occModule('TopTools')
+    XCAFApp = occModule('XCAFApp')
+    XCAFDoc = occModule('XCAFDoc')
+    STEPControl = occModule('STEPControl')
+    STEPCAFControl = occModule('STEPCAFControl')
+    IFSelect = occModule('IFSelect')
+
+    doc = TDocStd.TDocStd_Document(TCollection.TCollection_ExtendedString("MDTV-XCAF"))
+    XCAFApp.XCAFApp_Application_GetApplication().NewDocument(
+        TCollection.TCollection_ExtendedString("MDTV-XCAF"), doc)
+    shapeTool = XCAFDoc.XCAFDoc_DocumentTool_ShapeTool(doc.Main())
+    colorTool = XCAFDoc.XCAFDoc_DocumentTool_ColorTool(doc.Main())
+
+    for shape, name, color in items:
+        shape = scaleOCC(shape, scale)
+        label = shapeTool.AddShape(shape, False)
+        TDataStd.TDataStd_Name_Set(label, TCollection.TCollection_ExtendedString(name))
+        if isinstance(color, list):
+            # FreeCAD lists faces in the order of an indexed map as well
+            faces = TopTools.TopTools_IndexedMapOfShape()
+            TopExp.topexp_MapShapes(shape, TopAbs.TopAbs_FACE, faces)
+            for i in range(faces.Size()):
+                faceLabel = shapeTool.AddSubShape(label, faces.FindKey(i+1))
+                colorTool.SetColor(faceLabel, color[i], XCAFDoc.XCAFDoc_ColorSurf)
+        else:
+            colorTool.SetColor(label, color, XCAFDoc.XCAFDoc_ColorSurf)
+
+    writer = STEPCAFControl.STEPCAFControl_Writer()
+    writer.SetColorMode(True)
+    writer.SetNameMode(True)
+    writer.Transfer(doc, STEPControl.STEPControl_AsIs)
+    if writer.Write(filename) != IFSelect.IFSelect_RetDone:
+        raise Exception("Failed to write STEP file '%s'." % filename)
+
+def exportSTEP(parts, outputs, fuse=False, name=None):
+    """Exports given parts to STEP files in one or more scales. Shapes
+    are converted (and fused) only once.
+
+    `parts` : list of (FreeCAD shape, color, part name) tuples
+    `outputs` : list of (filename, scale) tuples, scale can be None
+    `fuse` : fuse parts into a single shape, faces keep part colors
+    `name` : name of the fused shape
+    """
+    if fuse:
+        fused, sources = fuseShapes([p[0] for p in parts])
+        colors = [occColor(p[1]) for p in parts]
+        items = [(toOCC(fused), name or parts[0][2],
+                  [colors[i] for i in sources])]
+    else:
+        items = [(toOCC(shape), pname, occColor(color))
+                 for shape, color, pname in parts]
+
+    for filename, scale in outputs:
+        writeSTEP(items, filename, scale)
@@ -31,18 +31,28 @@
 # other hand will produce a slightly more dense output thus smaller
 # file size. Main factor is the lack of indentation and new lines.
 #
+# `exportShapesVRML` writes FreeCAD shapes directly, without
+# FreeCADGui. It supports fused models: the fused shape is tessellated
+# once and triangles of the same color are grouped into a single Shape
+# node, instead of a Shape node for each face.
+#
 
+from collections import OrderedDict
 from e3dmg import Material
+from e3dmg.exporters.fuse import fuseShapes
+from e3dmg.exporters.export_x3d import formatPoints, formatFaces
 
-def meshToVRML(mesh):
-    """Returns the VRML Shape node representation of a `Mesh`"""
+def meshToVRML(mesh, scale=None, precision=3, trim=False):
+    """Returns the VRML Shape node representation of a `Mesh`, points
+    are scaled with `scale` if given and written with `precision`
+    decimals, without trailing zeros if `trim` is given."""
     s = "Shape { geometry IndexedFaceSet { coordIndex ["
     # write coordinate indexes for each face
-    s += ','.join("%d,%d,%d,-1" % f for f in mesh.faces)
+    s += formatFaces(mesh.faces, "%d,%d,%d,-1", ',')
     s += "]" # closes coordIndex
     s += "coord Coordinate { point ["
     # write coordinate points for each vertex
-    s += ','.join('%.3f %.3f %.3f' % (p.x, p.y, p.z) for p in mesh.points)
+    s += formatPoints(mesh.points, precision, scale, ',', trim)
     s += "]}" # closes Coordinate
     s += "}\n" # closes IndexedFaceSet
 
@@ -55,7 +65,6 @@ def meshToVRML(mesh):
                    "transparency %f\n" % mesh.color.transparency
         s += "appearance Appearance{material Material{%s}}" % material
     else:
-        print(mesh.color)
         s += "appearance Appearance{material Material{diffuseColor %f %f %f}}" % mesh.color
 
     s += "}\n" # closes Shape
@@ -63,7 +72,7 @@ def meshToVRML(mesh):
     return s
 
 def shapeToMesh(shape, color, scale=None):
-    from export_x3d import Mesh
+    from e3dmg.exporters.export_x3d import Mesh
     mesh_data = shape.tessellate(1)
     points = mesh_data[0]
     if scale != None:
@@ -72,33 +81,107 @@ def shapeToMesh(shape, color, scale=None):
                 faces = mesh_data[1],
                 color = color)
 
-def exportVRML(objects, filepath):
-    """Export given list of Mesh objects to a VRML file.
+def exportVRML(objects, filepath, scale=None, precision=3, ranges=None,
+               trim=False):
+    """Export given list of Mesh objects to a VRML file, optionally
+    scaling them with `scale`. See `serializeVRML` for `ranges`.
 
     `Mesh` structure is defined in 'export_x3d.py'."""
 
-    with open(filepath, 'w') as f:
-        # write the standard VRML header
-        f.write("#VRML V2.0 utf8\n\n")
+    with open(filepath, 'wb') as f:
+        f.write(serializeVRML(objects, scale, precision, ranges, trim))
 
-        for obj in objects:
-            f.write(meshToVRML(obj))
+def serializeVRML(objects, scale=None, precision=3, ranges=None, trim=False):
+    """Returns VRML file content of given list of Mesh objects as bytes.
 
-def exportVRML2(objects, filepath):
-    """This is an EXPERIMENTAL exporter. Unlike above one, this one can
-    export fused multi color FreeCAD shapes, but it also relies on
-    FreeCADGui module. Output isn't good either (each face exported as
-    a different shape).
+    If `ranges` is given, `objects` is a list of detail levels, each a
+    list of Mesh objects, from the most detailed to the least. They
+    are written into a LOD node that switches levels at `ranges`
+    viewing distances.
     """
+    def shapes(objects):
+        return ''.join(meshToVRML(obj, scale, precision, trim) for obj in objects)
+
+    # standard VRML header
+    s = "#VRML V2.0 utf8\n\n"
+    if ranges is None:
+        s += shapes(objects)
+    else:
+        s += "LOD { range [%s]\nlevel [\n" % \
+             ','.join("%g" % (r*(scale or 1)) for r in ranges)
+        s += ''.join("Group { children [\n%s]}\n" % shapes(level)
+                     for level in objects)
+        s += "]}\n" # closes level and LOD
+    return s.encode('utf-8')
+
+def colorKey(color):
+    """Returns a hashable key for a (R, G, B) tuple or `Material`."""
+    if isinstance(color, Material):
+        return (tuple(color.diffuseColor), color.ambientIntensity,
+                tuple(color.specularColor), color.shininess,
+                tuple(color.emissiveColor), color.transparency)
+    return tuple(color)
+
+def shapeMeshes(parts, fuse=False, tolerance=1):
+    """Tessellates FreeCAD shapes and returns a list of `Mesh`, one for
+    each distinct color.
+
+    `parts` : list of (FreeCAD shape, color) tuples
+    `fuse` : fuse shapes before tessellation, faces keep part colors
+    `tolerance` : tessellation tolerance
+    """
+    shapes = [p[0] for p in parts]
+    if fuse:
+        fused, sources = fuseShapes(shapes)
+        return colorMeshes(fused, [parts[i][1] for i in sources], tolerance)
+
+    faceColors = [color for shape, color in parts for face in shape.Faces]
+    return colorMeshes(shapes, faceColors, tolerance)
+
+def colorMeshes(shapes, faceColors, tolerance=1):
+    """Tessellates a FreeCAD shape (or a list of shapes) once and
+    returns a list of `Mesh`, one for each distinct color. Points
+    shared by faces of the same color are merged.
 
-    with open(filepath, 'w') as f:
-        # write the standard VRML header
-        f.write("#VRML V2.0 utf8\n\n")
-
-        for obj in objects:
-            # does object have different colored faces?
-            if len(obj.ViewObject.DiffuseColor) > 1:
-                for i, face in enumerate(obj.Shape.Faces):
-                    f.write(meshToVRML(shapeToMesh(face, obj.ViewObject.DiffuseColor[i][0:3])))
-            else:
-                raise NotImplemented("Use other exporter :P")
+    `faceColors` : color or `Material` of each face of the shapes
+    """
+    from e3dmg.exporters.export_x3d import Mesh
+
+    if not isinstance(shapes, (list, tuple)):
+        shapes = [shapes]
+
+    # tessellate whole shapes first so that faces share edge points
+    for shape in shapes:
+        shape.tessellate(tolerance)
+    faces = [face for shape in shapes for face in shape.Faces]
+    if len(faces) != len(faceColors):
+        raise Exception("Shape has %d faces but %d face colors are given!" %
+                        (len(faces), len(faceColors)))
+
+    groups = OrderedDict() # color key: (Mesh, {point: index})
+    for face, color in zip(faces, faceColors):
+        points, triangles = face.tessellate(tolerance)
+        key = colorKey(color)
+        if not key in groups:
+            groups[key] = (Mesh(points=[], faces=[], color=color), {})
+        mesh, indexes = groups[key]
+        index = []
+        for p in points:
+            xyz = (p.x, p.y, p.z)
+            i = indexes.get(xyz)
+            if i is None:
+                i = indexes[xyz] = len(mesh.points)
+                mesh.points.append(p)
+            index.append(i)
+        mesh.faces.extend((index[a], index[b], index[c]) for a, b, c in triangles)
+
+    return [mesh for mesh, indexes in groups.values()]
+
+def exportShapesVRML(parts, filepath, fuse=False, scale=None):
+    """Export given FreeCAD shapes to a VRML file. Doesn't require
+    FreeCADGui.
+
+    `parts` : list of (FreeCAD shape, color) tuples, color can be a
+              `Material`
+    """
+    exportVRML(shapeMeshes(parts, fuse), filepath, scale)
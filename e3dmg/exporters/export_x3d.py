@@ -28,9 +28,8 @@
 # This is a script to export FreeCAD objects as X3D files.
 #
 
-import FreeCAD
 import xml.etree.ElementTree as et
-import os
+import os, re, operator, itertools
 from collections import namedtuple
 from e3dmg import Material
 
@@ -39,18 +38,70 @@ from e3dmg import Material
 # color: (Red, Green, Blue), values range from 0 to 1.0
 Mesh = namedtuple('Mesh', ['points', 'faces', 'color'])
 
-def getShapeNode(vertices, faces, color=None):
+# coordinates of a `Vector`
+_xyz = operator.attrgetter('x', 'y', 'z')
+
+# trailing zeros (and the decimal point if nothing is left after it)
+# of a fixed point number followed by a separator
+_trailingZeros = re.compile(r'\.?0+(?=[ ,])')
+_negativeZero = re.compile(r'(?<![0-9.])-0(?=[ ,])')
+
+def trimZeros(s):
+    """Removes trailing zeros of fixed point numbers in a string. Every
+    number must have a decimal point and be followed by a space or a
+    comma, ex: '1.500 -0.000 2.000 ' -> '1.5 0 2 '."""
+    return fixNegativeZeros(_trailingZeros.sub('', s))
+
+def fixNegativeZeros(s):
+    """Replaces '-0' numbers with '0'."""
+    # checking is much faster than the substitution
+    if '-0 ' in s or '-0,' in s:
+        s = _negativeZero.sub('0', s)
+    return s
+
+def formatPoints(points, precision=6, scale=None, separator=' ', trim=False):
+    """Formats coordinates of `Vector`s as 'x y z' triples joined with
+    `separator`, scaled with `scale` if given. All values are
+    formatted with a single operation. If `trim` is given, trailing
+    zeros are removed: output is smaller but writing takes longer."""
+    if not points:
+        return ''
+    coords = itertools.chain.from_iterable(map(_xyz, points))
+    if not (scale is None or scale == 1):
+        coords = (c*scale for c in coords)
+    f = "%%.%df" % precision
+    s = ((f + ' ' + f + ' ' + f + separator) * len(points)) % tuple(coords)
+    if trim:
+        s = trimZeros(s) if precision > 0 else fixNegativeZeros(s)
+    return s[:-1]
+
+def formatFaces(faces, fmt, separator=' '):
+    """Formats a list of (i, j, k) index tuples with `fmt` in bulk, ex:
+    fmt='%d %d %d -1'."""
+    if not faces:
+        return ''
+    return (separator.join([fmt] * len(faces))) % tuple(itertools.chain.from_iterable(faces))
+
+def getShapeNode(vertices, faces, color=None, scale=None, precision=6,
+                 triangles=False, trim=False):
     """Returns a <Shape> node for given mesh data.
     vertices: list of vertice coordinates as `Vector` type
     faces: list of tuple of vertice indexes ex: (1, 2, 3)
-    color: tuple in the form of (R, G, B) or `componentmodel.Material`"""
+    color: tuple in the form of (R, G, B) or `componentmodel.Material`
+    scale: scale factor applied to vertices while writing
+    precision: number of decimals of coordinates
+    triangles: write an <IndexedTriangleSet> instead of <IndexedFaceSet>
+    trim: remove trailing zeros of coordinates"""
 
     shapeNode = et.Element('Shape')
-    faceNode = et.SubElement(shapeNode, 'IndexedFaceSet')
-    faceNode.set('coordIndex', ' '.join(["%d %d %d -1" % face for face in faces]))
+    if triangles:
+        faceNode = et.SubElement(shapeNode, 'IndexedTriangleSet')
+        faceNode.set('index', formatFaces(faces, "%d %d %d"))
+    else:
+        faceNode = et.SubElement(shapeNode, 'IndexedFaceSet')
+        faceNode.set('coordIndex', formatFaces(faces, "%d %d %d -1"))
     coordinateNode = et.SubElement(faceNode, 'Coordinate')
-    coordinateNode.set('point',
-        ' '.join(["%f %f %f" % (p.x, p.y, p.z) for p in vertices]))
+    coordinateNode.set('point', formatPoints(vertices, precision, scale, trim=trim))
 
     if color != None:
         if isinstance(color, Material):
@@ -69,17 +120,43 @@ def getShapeNode(vertices, faces, color=None):
 
     return shapeNode
 
-def exportX3D(objects, filepath):
-    """Export given list of Mesh objects to a X3D file."""
+def exportX3D(objects, filepath, scale=None, precision=6, triangles=False,
+              ranges=None, trim=False):
+    """Export given list of Mesh objects to a X3D file, optionally
+    scaling them with `scale`. See `getShapeNode` and `serializeX3D`
+    for other parameters."""
+    with open(filepath, "wb") as f:
+        f.write(serializeX3D(objects, scale, precision, triangles, ranges, trim))
+
+def serializeX3D(objects, scale=None, precision=6, triangles=False, ranges=None,
+                 trim=False):
+    """Returns X3D file content of given list of Mesh objects as bytes.
+
+    If `ranges` is given, `objects` is a list of detail levels, each a
+    list of Mesh objects, from the most detailed to the least. They
+    are written into a <LOD> node that switches levels at `ranges`
+    viewing distances, see `decimate.lodLevels`.
+    """
 
     fileNode = et.Element('X3D')
     fileNode.set('profile', 'Interchange')
     fileNode.set('version', '3.3')
     sceneNode = et.SubElement(fileNode, 'Scene')
 
-    for o in objects:
-        shapeNode = getShapeNode(o.points, o.faces, o.color)
-        sceneNode.append(shapeNode)
+    def shapeNodes(objects):
+        return [getShapeNode(o.points, o.faces, o.color, scale, precision, triangles,
+                             trim)
+                for o in objects]
+
+    if ranges is None:
+        for shapeNode in shapeNodes(objects):
+            sceneNode.append(shapeNode)
+    else:
+        lodNode = et.SubElement(sceneNode, 'LOD')
+        lodNode.set('range', ' '.join("%g" % (r*(scale or 1)) for r in ranges))
+        for level in objects:
+            groupNode = et.SubElement(lodNode, 'Group')
+            for shapeNode in shapeNodes(level):
+                groupNode.append(shapeNode)
 
-    with open(filepath, "w") as f:
-        f.write(et.tostring(fileNode))
+    return et.tostring(fileNode)
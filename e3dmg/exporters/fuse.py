@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Helpers to fuse parts of a model into a single shape without losing
+# part colors. Fusing doesn't keep track of which part a face of the
+# resulting shape came from, so faces are matched to parts
+# geometrically: a point on the face is located on the surfaces of
+# the parts.
+#
+
+def facePoint(face):
+    """Returns a point on the given FreeCAD face."""
+    u0, u1, v0, v1 = face.ParameterRange
+    p = face.valueAt((u0+u1)/2., (v0+v1)/2.)
+    if face.isInside(p, 1e-6, True):
+        return p
+    # center of parameter space is in a hole or outside the trimmed
+    # face, use center of a triangle of the face instead
+    points, triangles = face.tessellate(0.1)
+    a, b, c = triangles[0]
+    return (points[a] + points[b] + points[c]) * (1./3)
+
+def faceSources(fused, shapes):
+    """Returns the index of the shape in `shapes` each face of `fused`
+    originated from."""
+    import Part
+    surfaces = [Part.Compound(s.Faces) for s in shapes]
+    boxes = [s.BoundBox for s in shapes]
+    for b in boxes:
+        b.enlarge(1e-3)
+
+    sources = []
+    for face in fused.Faces:
+        p = facePoint(face)
+        v = Part.Vertex(p)
+        candidates = [i for i, b in enumerate(boxes) if b.isInside(p)]
+        if len(candidates) == 1:
+            sources.append(candidates[0])
+            continue
+        candidates = candidates or range(len(shapes))
+        dists = [(surfaces[i].distToShape(v)[0], i) for i in candidates]
+        sources.append(min(dists)[1])
+    return sources
+
+def fuseShapes(shapes):
+    """Fuses given FreeCAD shapes. Returns the fused shape and a list of
+    source shape index for each of its faces."""
+    if len(shapes) == 1:
+        return shapes[0], [0] * len(shapes[0].Faces)
+    fused = shapes[0].multiFuse(shapes[1:])
+    return fused, faceSources(fused, shapes)
@@ -21,4 +21,25 @@
 class Generator(object):
     """This is abstract generator class. All other generators must inherit
     this one."""
-    pass
+
+    def check(self):
+        """Checks parameters of the generator without doing any modeling
+        and returns a list of error messages. An empty list means
+        parameters are valid. Generators should override this method
+        with cheap geometric sanity checks to catch invalid parameters
+        before running (costly) modeling operations."""
+        return []
+
+    def dimensions(self):
+        """Returns a dictionary of common dimensions of the component
+        for the catalog, without modeling it. Keys are 'pins' (number
+        of pins), 'pitch', 'length' and 'width' (overall size along X
+        and Y) and 'height', see `e3dmg/catalog.py`. Generators should
+        override this method; missing keys are unknown."""
+        return {}
+
+    def checkPositive(self, *names):
+        """Returns error messages for given parameters that are not
+        larger than 0."""
+        return ["%s=%s must be positive" % (n, getattr(self, n))
+                for n in names if not (getattr(self, n) or 0) > 0]
@@ -34,6 +34,12 @@ class BoxGen(Generator):
         self.h = h
         self.color = color
 
+    def check(self):
+        return self.checkPositive('l', 'w', 'h')
+
+    def dimensions(self):
+        return {'pins': 0, 'length': self.l, 'width': self.w, 'height': self.h}
+
     def generate(self):
         """Returns a ComponentModel."""
         b = cq.Workplane("XY").box(self.l, self.w, self.h)
@@ -19,7 +19,7 @@
 # <http://www.gnu.org/licenses/>.
 
 import cadquery as cq
-from e3dmg import ComponentModel, Generator
+from e3dmg import ComponentModel, Generator, Deferred
 
 from math import sqrt
 
@@ -50,12 +50,41 @@ class RadialGen(Generator):
 
         self.ef = 0.2       # top and bottom edges fillet
 
+        self.mmb_h = 2.     # lenght of the (-) marker on the cathode bar
+        self.mmb_w = 0.5    # rough width of the marker
+
         self.body_color = body_color
         self.bottom_color = (0.156, 0.156, 0.156)
         self.top_color = (0.859, 0.859, 0.859)
         self.bar_color = (0.781, 0.781, 0.781)
         self.lead_color = (0.938, 0.938, 0.938)
 
+    def check(self):
+        """Returns a list of errors in parameters."""
+        errors = self.checkPositive('L', 'D', 'd', 'F', 'll')
+        if errors:
+            return errors
+
+        if self.d >= self.F:
+            errors.append("leads overlap, lead diameter d=%s must be smaller than "
+                          "lead separation F=%s" % (self.d, self.F))
+        if self.F+self.d >= self.dc:
+            errors.append("leads (F=%s, d=%s) must be under the bottom cut of "
+                          "diameter %s" % (self.F, self.d, self.dc))
+        if self.D/2.-self.dc/2. <= self.ef:
+            errors.append("body diameter D=%s is too small for edge fillets" % self.D)
+        if self.L <= self.bt+self.bh+2*self.ef:
+            errors.append("body height L=%s is too small for the belt" % self.L)
+        if self.bf*2 >= self.bh:
+            errors.append("belt fillet is too large for the belt height")
+        if self.L < 2*self.mmb_h:
+            errors.append("body height L=%s is too small for (-) marks" % self.L)
+        return errors
+
+    def dimensions(self):
+        return {'pins': 2, 'pitch': self.F, 'length': self.D, 'width': self.D,
+                'height': self.L + self.bs}
+
     def generate(self):
         L = self.L     # overall height of the body
         D = self.D     # body diameter
@@ -85,8 +114,8 @@ class RadialGen(Generator):
         ciba = 45.  # angle of the cathode identification bar
 
         # TODO: calculate marker sizes according to the body size
-        mmb_h = 2.       # lenght of the (-) marker on the cathode bar
-        mmb_w = 0.5      # rough width of the marker
+        mmb_h = self.mmb_h  # lenght of the (-) marker on the cathode bar
+        mmb_w = self.mmb_w  # rough width of the marker
 
         ef_s2 = ef/sqrt(2)
         ef_x = ef-ef/sqrt(2)
@@ -137,18 +166,22 @@ class RadialGen(Generator):
               line(0,-D).line(ws,0).line(0,D).\
               line(D,0).line(0,ws).close().cutBlind(-ts)
 
-        # draw the (-) marks on the bar
-        n = int(L/(2*mmb_h)) # number of (-) marks to draw
-        points = []
-        first_z = (L-(2*n-1)*mmb_h)/2
-        for i in range(n):
-            points.append((0, (i+0.25)*2*mmb_h+first_z))
-        mmb = cq.Workplane("YZ", (-D/2,0,bs)).pushPoints(points).\
-              box(mmb_w, mmb_h, 2).\
-              edges("|X").fillet(mmb_w/2.-0.001)
+        # draw the (-) marks on the bar, they are costly so they are
+        # built only when the marks or the bar is exported
+        def marks():
+            n = int(L/(2*mmb_h)) # number of (-) marks to draw
+            points = []
+            first_z = (L-(2*n-1)*mmb_h)/2
+            for i in range(n):
+                points.append((0, (i+0.25)*2*mmb_h+first_z))
+            mmb = cq.Workplane("YZ", (-D/2,0,bs)).pushPoints(points).\
+                  box(mmb_w, mmb_h, 2).\
+                  edges("|X").fillet(mmb_w/2.-0.001)
+
+            return mmb.cut(mmb.translate((0,0,0)).cut(bar))
 
-        mmb = mmb.cut(mmb.translate((0,0,0)).cut(bar))
-        bar = bar.cut(mmb)
+        mmb = Deferred(marks)
+        marked_bar = Deferred(lambda: bar.cut(mmb()))
 
         # draw the leads
         leads = cq.Workplane("XY").workplane(offset=bs+tc).\
@@ -160,7 +193,7 @@ class RadialGen(Generator):
         model.addPart(mmb, self.body_color, "marks")
         model.addPart(top, self.top_color, "top")
         model.addPart(bottom, self.bottom_color, "bottom")
-        model.addPart(bar, self.bar_color, "bar")
+        model.addPart(marked_bar, self.bar_color, "bar")
         model.addPart(leads, self.lead_color, "pins")
 
         return model
@@ -201,6 +234,26 @@ class RadialSMDGen(Generator):
         self.body_color = (0.859, 0.859, 0.859)
         self.base_color = (0.156, 0.156, 0.156)
 
+    def check(self):
+        """Returns a list of errors in parameters."""
+        errors = self.checkPositive('L', 'D', 'A', 'H', 'P', 'W')
+        if errors:
+            return errors
+
+        if self.P+self.W >= self.H:
+            errors.append("pins must extend out of the base, max width H=%s is "
+                          "too small for pin distance P=%s and width W=%s" %
+                          (self.H, self.P, self.W))
+        if self.L <= self.c+self.h2+self.bh+2*self.br+self.ef:
+            errors.append("height L=%s is too small for the belt" % self.L)
+        if self.D/2. <= self.br+self.bf or self.D <= 2*self.ef:
+            errors.append("diameter D=%s is too small for the belt and fillets" % self.D)
+        return errors
+
+    def dimensions(self):
+        return {'pins': 2, 'pitch': self.P, 'length': self.H, 'width': self.A,
+                'height': self.L}
+
     def generate(self):
 
         L = self.L    # overall height
@@ -283,18 +336,17 @@ class RadialSMDGen(Generator):
 
         pins = pins.union(pins.rotate((0,0,0), (0,0,1), 180))
 
-        # draw the cathode identification mark
-        cim = cq.Workplane("XY", (-D/2.,0,L-ef)).\
-              box(cimw, D, ef, centered=(False, True, False))
-
-        # do intersection
-        cim = cim.cut(cim.translate((0,0,0)).cut(body))
+        # draw the cathode identification mark, built only when exported
+        def mark():
+            cim = cq.Workplane("XY", (-D/2.,0,L-ef)).\
+                  box(cimw, D, ef, centered=(False, True, False))
 
-        body.cut(cim)
+            # do intersection
+            return cim.cut(cim.translate((0,0,0)).cut(body))
 
         model = ComponentModel()
         model.addPart(body, self.body_color, "body")
         model.addPart(base, self.base_color, "base")
         model.addPart(pins, self.body_color, "pins")
-        model.addPart(cim, (0.,0.,0.), "mark")
+        model.addPart(mark, (0.,0.,0.), "mark")
         return model
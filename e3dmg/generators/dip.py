@@ -55,6 +55,40 @@ class DIPGen(Generator):
         self.case_color = (0.1, 0.1, 0.1)
         self.pins_color = (0.9, 0.9, 0.9)
 
+    def check(self):
+        """Returns a list of errors in parameters."""
+        errors = self.checkPositive('D', 'E1', 'E', 'A2', 'b1', 'b', 'e', 'npins')
+        if errors:
+            return errors
+
+        # first, second and last pins are drawn separately
+        if self.npins % 2 or self.npins < 6:
+            errors.append("npins=%s must be an even number, at least 6" % self.npins)
+        if not (self.b < self.b1 < self.e):
+            errors.append("pin widths b=%s, b1=%s must be smaller than pitch e=%s "
+                          "and b < b1" % (self.b, self.b1, self.e))
+        # outer sides of first and last pins are narrow (b)
+        if (self.npins//2-1)*self.e+self.b >= self.D:
+            errors.append("%s pins don't fit along the package length D=%s" %
+                          (self.npins, self.D))
+        if self.E1 >= self.E:
+            errors.append("package width E1=%s must be smaller than shoulder width E=%s" %
+                          (self.E1, self.E))
+        if self.A2 <= self.c:
+            errors.append("package height A2=%s must be larger than pin thickness %s" %
+                          (self.A2, self.c))
+        else:
+            A2_t = (self.A2-self.c)/2.
+            E1_t2 = self.E1-self.tb_s-2*tan(radians(self.the))*A2_t
+            if E1_t2 <= 2*(self.fp_r+self.fp_t) or E1_t2 <= 2*self.ti_r:
+                errors.append("top of the package is too narrow for indicators, "
+                              "increase E1=%s" % self.E1)
+        return errors
+
+    def dimensions(self):
+        return {'pins': self.npins, 'pitch': self.e, 'length': self.D,
+                'width': self.E, 'height': self.A1 + self.A2}
+
     def generate(self):
         # extract parameters to local namespace
         D = self.D
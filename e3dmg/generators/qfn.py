@@ -64,6 +64,52 @@ class BaseQFNGen(Generator):
         self.case_color = (0.3, 0.3, 0.3)
         self.pins_color = (0.9, 0.9, 0.9)
 
+    def check(self):
+        """Returns a list of errors in parameters."""
+        errors = self.checkPositive('D', 'E', 'A', 'b', 'e', 'npx', 'npy')
+        if errors:
+            return errors
+
+        b, e, L = self.b, self.e, self.L
+        cw = self.D-self.A1*2 # case width
+        cl = self.E-self.A1*2 # case length
+        if self.A1 < 0:
+            errors.append("A1=%s can't be negative" % self.A1)
+        if self.A <= self.A3:
+            errors.append("height A=%s must be larger than terminal thickness %s" % (self.A, self.A3))
+        if b >= e:
+            errors.append("pin width b=%s must be smaller than pitch e=%s" % (b, e))
+        if L <= b/2.:
+            errors.append("pin width b=%s is too large for pin length %s" % (b, L))
+        if (self.npx-1)*e+b > cw:
+            errors.append("%s pins don't fit along the body width D=%s" % (self.npx, self.D))
+        if (self.npy-1)*e+b > cl:
+            errors.append("%s pins don't fit along the body length E=%s" % (self.npy, self.E))
+
+        if self.epad:
+            if type(self.epad) == tuple:
+                D2, E2 = self.epad
+            else:
+                E2 = D2 = self.epad
+            if D2 >= cw-2*L or E2 >= cl-2*L:
+                errors.append("exposed pad %s overlaps with pins" % (self.epad,))
+            if self.ecc >= min(D2, E2):
+                errors.append("exposed pad %s is smaller than its corner chamfer" % (self.epad,))
+
+        if self.flanged:
+            if self.D1 > cw or self.E1 > cl:
+                errors.append("molded top D1=%s, E1=%s is larger than the body" % (self.D1, self.E1))
+            if self.P*2 >= min(self.D1, self.E1):
+                errors.append("corner chamfer P=%s is larger than the body" % self.P)
+            top = min(self.D1, self.E1)-2*tan(radians(self.the))*(self.A-self.A3)
+            if top <= 2*(self.fp_t+self.fp_r):
+                errors.append("molded top is too small, check draft angle")
+        return errors
+
+    def dimensions(self):
+        return {'pins': 2*(self.npx + self.npy), 'pitch': self.e, 'length': self.D,
+                'width': self.E, 'height': self.A}
+
     def generate(self):
         D = self.D
         E = self.E
@@ -61,6 +61,47 @@ class QFPGen(Generator):
         self.case_color = (0.1, 0.1, 0.1)
         self.pins_color = (0.9, 0.9, 0.9)
 
+    def check(self):
+        """Returns a list of errors in parameters."""
+        errors = self.checkPositive('D', 'E', 'D1', 'E1', 'A2', 'b', 'e', 'npx', 'npy')
+        if errors:
+            return errors
+
+        D, E, D1, E1, b, e = self.D, self.E, self.D1, self.E1, self.b, self.e
+        c = self.c
+        if self.A1 < 0:
+            errors.append("A1=%s can't be negative" % self.A1)
+        if self.A2 <= c:
+            errors.append("body height A2=%s must be larger than pin thickness %s" % (self.A2, c))
+        if b >= e:
+            errors.append("pin width b=%s must be smaller than pitch e=%s" % (b, e))
+        if E1 >= E:
+            errors.append("body length E1=%s must be smaller than overall length E=%s" % (E1, E))
+        # pin has 2 bends outside the body
+        if (D-D1)/2. <= self.R1+self.R2*2+c+self.S:
+            errors.append("pins are too short for bends, increase D=%s or decrease D1=%s" % (D, D1))
+
+        # corner chamfers are calculated from the space left by pins
+        A2_t = (self.A2-c)/2
+        D1_t2 = D1-self.tb_s-2*tan(radians(self.the))*A2_t
+        cc1 = min((D1-(self.npx-1)*e-b)/2., (E1-(self.npy-1)*e-b)/2.) - 0.5*self.tb_s
+        cc1 = min(cc1, self.max_cc1)
+        if cc1 <= 0:
+            errors.append("pins don't fit on the body sides with room for corner chamfers")
+        elif cc1/2.-(D1-D1_t2)/4. <= 0:
+            errors.append("corner chamfer is larger than the top of the body")
+
+        if self.epad:
+            D1_b = D1-2*tan(radians(self.the))*A2_t
+            E1_b = E1-2*tan(radians(self.the))*A2_t
+            if self.epad[0] >= D1_b or self.epad[1] >= E1_b:
+                errors.append("exposed pad %s is larger than the body bottom" % (self.epad,))
+        return errors
+
+    def dimensions(self):
+        return {'pins': 2*(self.npx + self.npy), 'pitch': self.e, 'length': self.D,
+                'width': self.E, 'height': self.A1 + self.A2}
+
     def generate(self):
         """Returns a ComponentModel."""
         # prepare parameters for easier access
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Model index: a description of every built component for downstream
+# tools, so that they don't have to load the output files. Index is
+# written to OUTDIR/index.json:
+#
+#   {"updated": 1500000000.0,
+#    "components": {
+#      "qfp.jedec:AKA": {
+#        "generator": "e3dmg.generators.qfp.QFPGen", "params": {...},
+#        "pins": 44,
+#        "parts": [{"name": "pins", "color": [...], "solids": 44,
+#                   "bbox": [xmin, ymin, zmin, xmax, ymax, zmax],
+#                   "faces": 528, "triangles": 2112, "vertices": 1232}],
+#        "outputs": [{"format": "STEP", "file": "qfp/jedec/AKA.step",
+#                     "scale": null, "size": 123456, "sha1": "..."}],
+#        "time": 1500000000.0}}}
+#
+# "triangles" and "vertices" of parts are only written if mesh
+# statistics are requested (make.py --index-meshes), they require
+# tessellating the model once more.
+#
+# Pin count is given by the generator (see `Generator.dimensions`),
+# it's `null` if the generator doesn't know it. Outputs in archives
+# also have an "archive" (shard file name).
+#
+# A record is written to OUTDIR/.index/ for each built component. When
+# a build finishes, index.json is rewritten from all records while
+# holding a lock file, thus concurrent builds and builds on several
+# machines sharing the output directory don't lose each other's
+# records.
+#
+
+import os, json, time, hashlib
+from e3dmg.cache import generatorInstance, encodeValue
+from e3dmg.distribute import makedirs, writeAtomic, fileLock
+
+def partInfo(cqobject, color, name, meshes=False, tolerance=1):
+    """Returns the index record of a model part. Part is tessellated
+    for mesh statistics only if `meshes` is given."""
+    shape = cqobject.toFreecad()
+    bb = shape.BoundBox
+    info = {'name': name, 'color': color, 'solids': len(shape.Solids),
+            'bbox': [bb.XMin, bb.YMin, bb.ZMin, bb.XMax, bb.YMax, bb.ZMax],
+            'faces': len(shape.Faces)}
+    if meshes:
+        points, triangles = shape.tessellate(tolerance)
+        info.update(triangles=len(triangles), vertices=len(points))
+    return info
+
+def modelInfo(generator, model, meshes=False):
+    """Returns the index record of a generated model, without outputs.
+    See `partInfo` for `meshes`."""
+    generator = generatorInstance(generator)
+    cls = type(generator)
+    return {'generator': "%s.%s" % (cls.__module__, cls.__name__),
+            'params': vars(generator),
+            'pins': generator.dimensions().get('pins'),
+            'parts': [partInfo(cqobject, color, name, meshes)
+                      for cqobject, color, name in model.parts]}
+
+class ModelIndex(object):
+    """Index of built components in an output directory.
+
+    `outdir` : output directory
+    """
+
+    def __init__(self, outdir):
+        self.outdir = os.path.abspath(outdir)
+        self.path = os.path.join(self.outdir, '.index')
+        makedirs(self.path)
+
+    def _record(self, component):
+        return os.path.join(self.path, hashlib.sha1(
+            component.encode('utf-8')).hexdigest() + '.json')
+
+    def _read(self, component):
+        try:
+            with open(self._record(component)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def output(self, ftype, location, scale, level, sha1, size):
+        """Returns the index record of an output.
+
+        `location` : location returned by the output backend
+        """
+        record = {'format': ftype, 'scale': scale, 'size': size, 'sha1': sha1}
+        if level is not None:
+            record['level'] = level
+        if isinstance(location, dict): # archive member
+            record['archive'] = os.path.basename(location['shard'])
+            record['file'] = location['entry']['name']
+        else:
+            record['file'] = os.path.relpath(location, self.outdir).replace(os.sep, '/')
+        return record
+
+    def add(self, component, info, outputs):
+        """Records a built component.
+
+        `info` : `modelInfo` result
+        `outputs` : list of `output` results
+        """
+        # keep outputs that aren't rebuilt, ex: when resuming
+        old = self._read(component)
+        if old:
+            rebuilt = set((o['format'], o['file']) for o in outputs)
+            outputs = [o for o in old['outputs']
+                       if not (o['format'], o['file']) in rebuilt] + outputs
+        record = dict(info, component=component, outputs=outputs, time=time.time())
+        writeAtomic(self._record(component), json.dumps(record, default=encodeValue))
+
+    def load(self):
+        """Returns the contents of index.json."""
+        try:
+            with open(os.path.join(self.outdir, 'index.json')) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {'updated': 0, 'components': {}}
+
+    def update(self):
+        """Rewrites index.json from the records of all built components.
+        Returns the number of components in the index."""
+        # records are read while holding the lock, so that an earlier
+        # build can't overwrite index.json with fewer records
+        with fileLock(os.path.join(self.path, 'lock'), timeout=600):
+            components = {}
+            for fname in os.listdir(self.path):
+                if not fname.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(self.path, fname)) as f:
+                        record = json.load(f)
+                except (IOError, OSError, ValueError): # removed meanwhile
+                    continue
+                components[record['component']] = record
+            index = {'updated': time.time(), 'components': components}
+            writeAtomic(os.path.join(self.outdir, 'index.json'),
+                        json.dumps(index, sort_keys=True, default=encodeValue))
+        return len(components)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Build journal keeps a record of completed outputs so that an
+# interrupted build can be resumed. Journal is an append-only file of
+# JSON lines, one line for each output file of a component:
+#
+#   {"component": "qfp.jedec:AKA", "format": "STEP",
+#    "file": "/path/AKA.step", "sha1": "...", "options": {...}}
+#
+# A line is written only after its output file is completely written
+# and synced to disk. On resume, an output is skipped only if its
+# file still exists with the recorded hash. Outputs that are moved
+# elsewhere after they are written (ex: into an archive) also record
+# their `location`. A partially written line
+# (ex: crash while appending) is ignored.
+#
+
+import os, json, glob, socket, hashlib
+
+def fileHash(filename):
+    """Returns SHA1 hash of a file as hex string."""
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+def syncFile(filename):
+    """Flushes file contents to the disk."""
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class BuildJournal(object):
+    """Journal of completed outputs of a build.
+
+    `outdir` : output directory, journals are kept in this directory
+    `resume` : if `True` records of previous runs are loaded, otherwise
+               journal of this machine is started from scratch
+
+    Each machine writes its own journal file (`.journal-HOSTNAME`), but
+    journals of all machines are read when resuming.
+    """
+
+    def __init__(self, outdir, resume=False):
+        self.records = {}
+        self.path = os.path.join(outdir, '.journal-%s' % socket.gethostname())
+        if resume:
+            for fname in sorted(glob.glob(os.path.join(outdir, '.journal-*'))):
+                self._load(fname)
+        self.file = open(self.path, 'a' if resume else 'w')
+        # if last line was left incomplete, don't append to it
+        if os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self.file.write('\n')
+
+    def _load(self, filename):
+        with open(filename) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                    self.records[(r['component'], r['format'], r['file'])] = r
+                except (ValueError, KeyError):
+                    continue # incomplete or corrupt line
+
+    def isDone(self, component, ftype, filename, options, hashFunc=fileHash):
+        """Returns `True` if given output is recorded with same options
+        and its file is intact. `hashFunc` returns the hash of the
+        output given its location."""
+        r = self.records.get((component, ftype, filename))
+        if r is None or r.get('options') != options:
+            return False
+        try:
+            return hashFunc(r.get('location', filename)) == r['sha1']
+        except (IOError, OSError):
+            return False
+
+    def record(self, component, ftype, filename, sha1, options, location=None):
+        """Records a completed output. Output file must be already synced
+        to the disk."""
+        r = {'component': component, 'format': ftype, 'file': filename,
+             'sha1': sha1, 'options': options}
+        if location is not None:
+            r['location'] = location
+        self.file.write(json.dumps(r, sort_keys=True) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.records[(component, ftype, filename)] = r
+
+    def close(self):
+        self.file.close()
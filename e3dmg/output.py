@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Output backends of the build.
+#
+# `DirectoryOutput` keeps every output as a file in a directory tree
+# mirroring the database, ex: OUTDIR/qfp/jedec/AKA.step.
+#
+# `ArchiveOutput` streams outputs into zip or tar shards of bounded
+# size instead, which avoids hundreds of thousands of small files. The
+# build process that owns the output is the only writer of its
+# shards, named `models-HOST-PID-N.zip`. Next to each shard there is
+# an index file (`models-HOST-PID-N.zip.idx`) of JSON lines, one for
+# each member:
+#
+#   {"name": "qfp/jedec/AKA.step", "offset": 1234, "size": 5678,
+#    "length": 20000, "compression": "deflate", "sha1": "..."}
+#
+# `offset` and `size` locate the (compressed) data of the member in
+# the shard, so a single model can be extracted with one read, without
+# scanning the shard or even its zip directory. Index lines are
+# written as members are added, thus shards of an interrupted build
+# are still usable. An index line may also be an alias of a member
+# stored in another shard, in that case it has a "shard" field with
+# the file name of that shard.
+#
+# Run `python -m e3dmg.output OUTDIR` to list archived models and
+# `python -m e3dmg.output OUTDIR NAME [DEST]` to extract one.
+#
+
+import os, sys, glob, json, zlib, socket, shutil, hashlib, tarfile, zipfile
+from e3dmg.distribute import makedirs
+from e3dmg.journal import fileHash
+
+ARCHIVE_FORMATS = ['zip', 'tar']
+
+class DirectoryOutput(object):
+    """Writes outputs as files into a directory."""
+
+    def __init__(self, outdir):
+        self.outdir = os.path.abspath(outdir)
+
+    def path(self, name):
+        """Returns the filename an output with given name should be
+        written to."""
+        return os.path.join(self.outdir, name)
+
+    def store(self, filename):
+        """Stores a written output file, returns its location."""
+        return filename
+
+    def hash(self, location):
+        """Returns SHA1 hash of a stored output."""
+        return fileHash(location)
+
+    def size(self, location):
+        """Returns size of a stored output in bytes."""
+        return os.path.getsize(location)
+
+    def alias(self, filename, location):
+        """Makes output at `filename` a copy of an already stored output
+        without writing its data again: a hard link. Returns location
+        of the new output."""
+        makedirs(os.path.dirname(filename))
+        tmp = "%s.tmp-%s-%d" % (filename, socket.gethostname(), os.getpid())
+        try:
+            os.link(location, tmp)
+        except (OSError, AttributeError):
+            # file system (or platform) doesn't support hard links
+            shutil.copyfile(location, tmp)
+        os.rename(tmp, filename)
+        return filename
+
+    def close(self):
+        pass
+
+def readMember(shard, entry):
+    """Reads data of an archive member given its index entry."""
+    with open(shard, 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['size'])
+    if entry['compression'] == 'deflate':
+        data = zlib.decompress(data, -15)
+    return data
+
+class ArchiveOutput(object):
+    """Writes outputs into zip or tar shards of bounded size.
+
+    `outdir` : directory of shards
+    `fmt` : one of `ARCHIVE_FORMATS`
+    `maxSize` : size limit of a shard in bytes, a new shard is started
+                when adding a file would exceed it
+    """
+
+    def __init__(self, outdir, fmt='zip', maxSize=1 << 30):
+        if not fmt in ARCHIVE_FORMATS:
+            raise Exception("Unknown archive format '%s'." % fmt)
+        self.outdir = os.path.abspath(outdir)
+        self.fmt = fmt
+        self.maxSize = maxSize
+        # outputs are written here by the workers before they are archived
+        self.staging = os.path.join(self.outdir, '.staging')
+        self.prefix = "models-%s-%d" % (socket.gethostname(), os.getpid())
+        self.count = 0
+        self.archive = None # current shard
+        self.shard = None # path of current shard
+        self.index = None # index file of current shard
+
+    def path(self, name):
+        return os.path.join(self.staging, name)
+
+    def _size(self):
+        if self.fmt == 'zip':
+            return self.archive.fp.tell()
+        else:
+            return self.archive.offset
+
+    def _open(self):
+        makedirs(self.outdir)
+        while True:
+            self.count += 1
+            self.shard = os.path.join(self.outdir, "%s-%d.%s" %
+                                      (self.prefix, self.count, self.fmt))
+            if not os.path.exists(self.shard):
+                break
+        if self.fmt == 'zip':
+            self.archive = zipfile.ZipFile(self.shard, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(self.shard, 'w')
+        self.index = open(self.shard + '.idx', 'w')
+
+    def _add(self, filename, name):
+        """Adds a file to current shard, returns its index entry."""
+        length = os.path.getsize(filename)
+        if self.fmt == 'zip':
+            self.archive.write(filename, name)
+            info = self.archive.infolist()[-1]
+            # local file header is 30 bytes + name + extra field
+            offset = info.header_offset + 30 + len(info.filename.encode('utf-8')) + \
+                     len(info.extra)
+            size = info.compress_size
+            compression = 'deflate' if info.compress_type == zipfile.ZIP_DEFLATED else None
+        else:
+            self.archive.add(filename, name)
+            # data is padded to 512 byte blocks after the header
+            size = length
+            offset = self.archive.offset - (size + tarfile.BLOCKSIZE - 1) // \
+                     tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+            compression = None
+        return {'name': name, 'offset': offset, 'size': size,
+                'length': length, 'compression': compression,
+                'sha1': fileHash(filename)}
+
+    def store(self, filename):
+        """Moves a written output file from staging directory into a
+        shard. Returns its location (shard and index entry)."""
+        name = os.path.relpath(filename, self.staging).replace(os.sep, '/')
+        if self.archive is not None and \
+           self._size() + os.path.getsize(filename) > self.maxSize:
+            self._closeShard()
+        if self.archive is None:
+            self._open()
+        entry = self._add(filename, name)
+        if self.fmt == 'zip':
+            self.archive.fp.flush()
+        else:
+            self.archive.fileobj.flush()
+        self.index.write(json.dumps(entry, sort_keys=True) + '\n')
+        self.index.flush()
+        os.remove(filename)
+        return {'shard': self.shard, 'entry': entry}
+
+    def hash(self, location):
+        return hashlib.sha1(readMember(location['shard'], location['entry'])).hexdigest()
+
+    def size(self, location):
+        return location['entry']['length']
+
+    def alias(self, filename, location):
+        """Adds an index entry for output `filename` that points to the
+        data of an already archived output."""
+        if self.archive is None:
+            self._open()
+        entry = dict(location['entry'])
+        entry['name'] = os.path.relpath(filename, self.staging).replace(os.sep, '/')
+        entry['shard'] = os.path.basename(location['shard'])
+        self.index.write(json.dumps(entry, sort_keys=True) + '\n')
+        self.index.flush()
+        return {'shard': location['shard'], 'entry': entry}
+
+    def _closeShard(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.index.close()
+            self.archive = None
+
+    def close(self):
+        self._closeShard()
+        # remove empty staging directories
+        for dirpath, dirnames, filenames in os.walk(self.staging, topdown=False):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass # not empty
+
+class ArchiveIndex(object):
+    """Index of all archived models in a directory, loaded from shard
+    index files. If a model is archived more than once, the most
+    recent one is used."""
+
+    def __init__(self, outdir):
+        self.members = {} # name: (shard, entry)
+        indexes = glob.glob(os.path.join(outdir, '*.idx'))
+        for idx in sorted(indexes, key=os.path.getmtime):
+            shard = idx[:-len('.idx')]
+            with open(idx) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # incomplete line
+                    if 'shard' in entry: # alias
+                        self.members[entry['name']] = (
+                            os.path.join(os.path.dirname(idx), entry['shard']), entry)
+                    else:
+                        self.members[entry['name']] = (shard, entry)
+
+    def names(self):
+        return sorted(self.members)
+
+    def read(self, name):
+        """Returns the content of an archived model."""
+        if not name in self.members:
+            raise Exception("Model '%s' isn't found in archives." % name)
+        return readMember(*self.members[name])
+
+    def extract(self, name, dest=None):
+        """Writes an archived model to `dest`, to a file with the same
+        base name in current directory by default."""
+        dest = dest or os.path.basename(name)
+        with open(dest, 'wb') as f:
+            f.write(self.read(name))
+        return dest
+
+if __name__ == "__main__":
+    if not 2 <= len(sys.argv) <= 4:
+        sys.exit("Usage: python -m e3dmg.output OUTDIR [NAME [DEST]]")
+    index = ArchiveIndex(sys.argv[1])
+    if len(sys.argv) == 2:
+        for name in index.names():
+            print(name)
+    else:
+        print(index.extract(*sys.argv[2:]))
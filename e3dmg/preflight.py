@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Preflight validation of database entries. Parameters of each
+# generator are checked with `Generator.check()` which doesn't do any
+# modeling, thus whole database can be checked in seconds before
+# starting a build.
+#
+
+import multiprocessing
+
+def checkEntry(entry):
+    """Checks a database entry. Returns a tuple of (package, name,
+    errors)."""
+    try:
+        errors = entry['generator'].check()
+    except Exception as e:
+        errors = ["check failed: %s" % e]
+    return entry['package'], entry['name'], errors
+
+def preflight(entries, processes=None, chunksize=64):
+    """Checks given database entries in parallel.
+
+    `entries` : an iterable of database entries as returned from
+                `dbutils.iterAllAt`
+    `processes` : number of worker processes, defaults to number of
+                  CPUs, if 1 entries are checked in this process
+
+    Returns a tuple: (number of checked entries, list of (package,
+    name, errors) tuples of invalid entries).
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(checkEntry, entries, chunksize)
+    else:
+        pool = None
+        results = (checkEntry(e) for e in entries)
+
+    checked = 0
+    invalid = []
+    try:
+        for package, name, errors in results:
+            checked += 1
+            if errors:
+                invalid.append((package, name, errors))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    invalid.sort()
+    return checked, invalid
+
+def printInvalid(invalid):
+    """Prints invalid entries returned from `preflight`."""
+    for package, name, errors in invalid:
+        print("Invalid %s:%s" % (package[len('e3dmg.database.'):], name))
+        for e in errors:
+            print("    %s" % e)
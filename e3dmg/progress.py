@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Build progress display. Shows finished components out of total,
+# components per minute, estimated remaining time, failures and model
+# cache hits:
+#
+#   [ 120/1000  12%] 14.2/min, ETA 1h02m, 3 failed, 40 cached
+#
+# On a terminal the status line is redrawn every second, otherwise
+# (ex: CI logs) a summary line is printed periodically.
+#
+# Components don't take equal time: a 256 pin QFP takes much longer
+# than a capacitor. Build times of components are kept in
+# OUTDIR/.history.json, remaining time is estimated from the
+# historical costs of remaining components and the rate at which cost
+# is completed in the last few minutes. Components without history
+# count as the average.
+#
+
+import os, sys, json, time, threading
+from collections import deque
+from e3dmg.distribute import writeAtomic
+
+def formatDuration(seconds):
+    """Formats seconds as '1h02m', '4m05s' or '12s'."""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return "%dh%02dm" % (seconds // 3600, seconds % 3600 // 60)
+    if seconds >= 60:
+        return "%dm%02ds" % (seconds // 60, seconds % 60)
+    return "%ds" % seconds
+
+class BuildHistory(object):
+    """Build times of components in seconds.
+
+    `outdir` : output directory, history is kept in '.history.json'
+    """
+
+    def __init__(self, outdir):
+        self.filename = os.path.join(outdir, '.history.json')
+        self.times = {}
+        try:
+            with open(self.filename) as f:
+                self.times = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass
+        self.updated = {}
+
+    def record(self, component, seconds):
+        self.times[component] = self.updated[component] = seconds
+
+    def save(self):
+        """Writes recorded times, merged with times recorded by other
+        builds meanwhile."""
+        if not self.updated:
+            return
+        try:
+            with open(self.filename) as f:
+                times = json.load(f)
+        except (IOError, OSError, ValueError):
+            times = {}
+        times.update(self.updated)
+        writeAtomic(self.filename, json.dumps(times, sort_keys=True))
+
+class Progress(object):
+    """Tracks and displays progress of a build.
+
+    `components` : list of keys of the components to build, `None` if
+                   not known (ex: building from a work queue)
+    `history` : dictionary of historical build times of components
+    `interval` : seconds between summary lines if output isn't a
+                 terminal
+    `window` : time window in seconds for rate calculation
+    """
+
+    def __init__(self, components=None, history={}, interval=30, window=300,
+                 stream=sys.stdout):
+        self.total = None if components is None else len(components)
+        known = [history[c] for c in (components or []) if c in history]
+        self.average = sum(known) / len(known) if known else 1.
+        self.history = dict(history) # not changed by builds meanwhile
+        self.remainingCost = sum(self.cost(c) for c in components or [])
+        self.interval = interval
+        self.window = window
+        self.stream = stream
+        self.tty = hasattr(stream, 'isatty') and stream.isatty()
+
+        self.done = 0
+        self.failed = 0
+        self.cached = 0
+        self.recent = deque() # (time, cost) of recently finished components
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def cost(self, component):
+        """Returns expected build time of a component."""
+        return self.history.get(component, self.average)
+
+    def skip(self, component):
+        """Marks a component that doesn't need to be built as done."""
+        with self.lock:
+            self.done += 1
+            self.remainingCost -= self.cost(component)
+
+    def finished(self, component, ok=True, cached=False):
+        """Marks a component as built (or failed)."""
+        with self.lock:
+            now = time.time()
+            cost = self.cost(component)
+            self.done += 1
+            self.failed += not ok
+            self.cached += bool(cached)
+            self.remainingCost -= cost
+            self.recent.append((now, cost))
+            while self.recent and self.recent[0][0] < now - self.window:
+                self.recent.popleft()
+        if self.tty:
+            self.show()
+
+    def status(self):
+        """Returns the status line."""
+        with self.lock:
+            now = time.time()
+            elapsed = min(now - self.started, self.window)
+            recent = [r for r in self.recent if r[0] >= now - self.window]
+            if self.total:
+                s = "[%*d/%d %3d%%]" % (len(str(self.total)), self.done, self.total,
+                                        100 * self.done // self.total)
+            else:
+                s = "[%d]" % self.done
+            if recent and elapsed > 0:
+                s += " %.1f/min" % (len(recent) * 60. / elapsed)
+                if self.total:
+                    rate = sum(c for t, c in recent) / elapsed
+                    s += ", ETA %s" % formatDuration(max(0, self.remainingCost) / rate)
+            s += ", %d failed" % self.failed
+            if self.cached:
+                s += ", %d cached" % self.cached
+            return s
+
+    def show(self):
+        if self.tty:
+            # cursor is returned to line start so that build messages
+            # overwrite the status line instead of following it
+            self.stream.write("\r\033[K%s\r" % self.status())
+        else:
+            self.stream.write("Progress: %s\n" % self.status())
+        self.stream.flush()
+
+    def _run(self):
+        while not self.stopped.wait(1 if self.tty else self.interval):
+            self.show()
+
+    def start(self):
+        """Starts displaying the progress in a background thread."""
+        self.started = time.time()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stops displaying and prints a final summary."""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        if self.tty:
+            self.stream.write("\r\033[K")
+        self.stream.write("Finished %d components in %s, %d failed, %d cached.\n" %
+                          (self.done, formatDuration(time.time() - self.started),
+                           self.failed, self.cached))
+        self.stream.flush()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# Parametric sweeps define a whole family of components with a single
+# generator class and lists of parameter values. Variants are created
+# lazily from the Cartesian product of parameter values. Put a `Sweep`
+# object in a database module and it is treated like a set of
+# generator objects:
+#
+#     QFN = Sweep(QFNGen, "QFN{np}_{D}x{E}_P{e}",
+#                 dict(D = [3., 4., 5.],
+#                      E = lambda p: p['D'],
+#                      A = 0.9, A1 = 0.02, b = 0.25,
+#                      e = [0.4, 0.5],
+#                      np = [16, 20, 24],
+#                      epad = lambda p: p['D']-1.3),
+#                 constraints = [lambda p: (p['np']/4+1)*p['e'] < p['D']])
+#
+
+import itertools, string
+from e3dmg import Generator
+
+# types of swept parameter values, note that tuples are single values
+SWEEP_TYPES = (list, type(range(0)))
+
+def frange(start, stop, step):
+    """Returns a list of floats from `start` to `stop` (inclusive) with
+    `step` increments. Values are rounded to suppress float noise."""
+    n = int(round((stop-start)/float(step)))
+    return [round(start + i*step, 9) for i in range(n+1)]
+
+class NameFormatter(string.Formatter):
+    """Formats floats without trailing zeros: 3.0 -> '3', 0.50 -> '0.5'"""
+
+    def format_field(self, value, format_spec):
+        if isinstance(value, float) and not format_spec:
+            return "%g" % value
+        return string.Formatter.format_field(self, value, format_spec)
+
+def canonical(value):
+    """Returns a hashable, float noise free representation of a value."""
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, (tuple, list)):
+        return tuple(canonical(v) for v in value)
+    return value
+
+class Sweep(object):
+    """A family of components created by sweeping generator parameters.
+
+    `generator` : generator class
+    `name` : name format string, ex: "QFN{np}_{D}x{E}", or a function
+             that takes parameters dictionary and returns a name
+    `params` : dictionary of parameters. Values can be a list (or
+               range) of values to sweep, a function of the other
+               parameters (derived parameter) or a single value,
+               tuples are single values
+    `constraints` : list of functions that take parameters dictionary
+                    and return False for invalid combinations
+
+    Derived parameters are calculated in alphabetical order after
+    swept and fixed parameters, thus a derived parameter can use
+    derived parameters whose names come before it.
+
+    Variants with identical parameters are created only once.
+    """
+
+    def __init__(self, generator, name, params, constraints=None):
+        if not issubclass(generator, Generator):
+            raise Exception("%s is not a generator class!" % generator)
+        self.generator = generator
+        self.name = name
+        self.params = params
+        self.constraints = constraints or []
+
+        self.swept = sorted(k for k, v in params.items()
+                            if isinstance(v, SWEEP_TYPES))
+        self.derived = sorted(k for k, v in params.items() if callable(v))
+        self.fixed = dict((k, v) for k, v in params.items()
+                          if not (k in self.swept or k in self.derived))
+        self._variants = None # name: parameters, created by `get`
+
+    def makeName(self, params):
+        if callable(self.name):
+            return self.name(params)
+        return NameFormatter().format(self.name, **params)
+
+    def variants(self):
+        """Yields (name, parameters) tuples of all valid variants."""
+        seen = set()
+        names = {}
+        values = [self.params[k] for k in self.swept]
+        for combination in itertools.product(*values):
+            p = dict(self.fixed)
+            p.update(zip(self.swept, combination))
+            for k in self.derived:
+                p[k] = self.params[k](p)
+            if not all(c(p) for c in self.constraints):
+                continue
+            key = tuple(sorted((k, canonical(v)) for k, v in p.items()))
+            if key in seen:
+                continue
+            seen.add(key)
+            name = self.makeName(p)
+            if name in names:
+                raise Exception("Sweep creates name %s for different parameters: "
+                                "%s and %s" % (name, names[name], p))
+            names[name] = p
+            yield name, p
+
+    def __iter__(self):
+        """Yields (name, generator object) tuples of all variants."""
+        for name, params in self.variants():
+            yield name, self.generator(**params)
+
+    def get(self, name):
+        """Returns the generator object of named variant or `None`.
+        Variants are created once, then looked up by name."""
+        if self._variants is None:
+            self._variants = dict(self.variants())
+        params = self._variants.get(name)
+        return None if params is None else self.generator(**params)
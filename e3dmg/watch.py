@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Rebuilding components when their source files change, see
+# `make.py --watch`.
+#
+# A database entry depends on its database file (python module or
+# table) and on the source files of its generator class, including the
+# e3dmg modules they use; ex: `database/qfn.py` -> `generators/qfn.py`
+# -> `cqutils.py`. Files are polled for changes, thus no file system
+# notification library is needed. A burst of saves is collected until
+# files stay unchanged for a while (debounce), then only the affected
+# components are rebuilt.
+#
+# Database and generator modules (and other changed e3dmg modules that
+# aren't used by make.py itself) are removed from `sys.modules` so that
+# they are imported again with the new code. Each build runs in a child
+# process, a crashing or failing build doesn't stop watching.
+#
+
+import os, sys, time, traceback, multiprocessing
+from e3dmg import dbutils
+from e3dmg.cache import moduleDependencies, moduleFile, sourceFiles, generatorInstance
+from e3dmg.distribute import componentKey
+
+# packages that are imported again when any of their files change
+RELOADED = ['e3dmg.database', 'e3dmg.generators']
+
+# extensions of watched files
+EXTENSIONS = ['.py'] + dbutils.TABLE_EXTENSIONS
+
+def entrySources(entry):
+    """Returns the set of source files of a database entry."""
+    table = dbutils.findTable(entry['package'])
+    if table:
+        files = set([table])
+    else:
+        files = set(moduleFile(m)
+                    for m in moduleDependencies(sys.modules[entry['package']]))
+    try:
+        files.update(sourceFiles(type(generatorInstance(entry['generator']))))
+    except Exception: # ex: unknown generator of a table row, build reports it
+        pass
+    files.discard(None)
+    return set(os.path.abspath(f) for f in files)
+
+class DependencyGraph(object):
+    """Source files of database entries.
+
+    `entries` : database entries
+    """
+
+    def __init__(self, entries):
+        self.sources = {} # component key: set of files
+        self.entries = {} # component key: entry
+        for entry in entries:
+            key = componentKey(entry)
+            self.sources[key] = entrySources(entry)
+            self.entries[key] = entry
+
+    def files(self):
+        """Returns all source files of entries."""
+        return set(f for files in self.sources.values() for f in files)
+
+    def affected(self, changed):
+        """Returns keys of the entries that depend on any of the
+        `changed` files."""
+        return sorted(key for key, files in self.sources.items()
+                      if not files.isdisjoint(changed))
+
+def packageFiles():
+    """Returns database and generator files, including new ones."""
+    files = set()
+    for name in RELOADED:
+        root = os.path.dirname(os.path.abspath(moduleFile(sys.modules[name])))
+        for dirpath, dirnames, filenames in os.walk(root):
+            files.update(os.path.join(dirpath, f) for f in filenames
+                         if os.path.splitext(f)[1] in EXTENSIONS)
+    return files
+
+def scanFiles(files):
+    """Returns a dictionary of modification times of existing files."""
+    mtimes = {}
+    for f in files:
+        try:
+            mtimes[f] = os.path.getmtime(f)
+        except OSError: # removed
+            pass
+    return mtimes
+
+def changedFiles(old, new):
+    """Returns files that are modified, created or removed between two
+    `scanFiles` results."""
+    return set(f for f in set(old) | set(new) if old.get(f) != new.get(f))
+
+def waitForChanges(files, snapshot, debounce=1., poll=0.5):
+    """Waits until some files change and then stay unchanged for
+    `debounce` seconds. Returns changed files and a new snapshot.
+
+    `files` : function that returns the files to watch
+    `snapshot` : `scanFiles` result to compare with
+    """
+    current = snapshot
+    lastChange = None
+    while True:
+        time.sleep(poll)
+        latest = scanFiles(files())
+        if latest != current:
+            current = latest
+            lastChange = time.time()
+        elif lastChange is not None and time.time() - lastChange >= debounce:
+            return changedFiles(snapshot, current), current
+
+def unloadModules(changed, keep):
+    """Removes database and generator modules, and e3dmg modules of
+    `changed` files from `sys.modules` so that they are imported again.
+    Modules in `keep` are not removed. Returns changed files of the
+    modules that are kept."""
+    kept = set()
+    for name, module in list(sys.modules.items()):
+        if module is None or not name.startswith('e3dmg.'):
+            continue
+        filename = moduleFile(module)
+        filename = filename and os.path.abspath(filename)
+        if name in keep:
+            if filename in changed:
+                kept.add(filename)
+        elif filename in changed or \
+             any(name == p or name.startswith(p + '.') for p in RELOADED):
+            del sys.modules[name]
+    # these keep generator classes and table rows of removed modules
+    dbutils._classes.clear()
+    dbutils._tables.clear()
+    return kept
+
+def runIsolated(func, *args):
+    """Runs a function in a child process and returns its exit code."""
+    process = multiprocessing.Process(target=func, args=args)
+    process.start()
+    process.join()
+    return process.exitcode
+
+def watch(select, build, debounce=1., poll=0.5):
+    """Builds database entries and rebuilds them when their source
+    files change, until interrupted.
+
+    `select` : function that returns the database entries to watch
+    `build` : function that builds a list of entries, it's called in a
+              child process with a flag that is `True` for rebuilds
+    `debounce` : waiting time in seconds after the last file change
+    """
+    # modules of make.py and e3dmg core can't be imported again
+    keep = set(name for name in sys.modules if name.startswith('e3dmg.'))
+    keep.difference_update(name for name in list(keep)
+                           if any(name.startswith(p) for p in RELOADED))
+
+    graph = DependencyGraph(select())
+    files = lambda: graph.files() | packageFiles()
+    snapshot = scanFiles(files())
+    runIsolated(build, [graph.entries[k] for k in sorted(graph.entries)], False)
+
+    while True:
+        print("Watching %d files for changes..." % len(snapshot))
+        changed, snapshot = waitForChanges(files, snapshot, debounce, poll)
+        for f in sorted(unloadModules(changed, keep)):
+            print("%s is changed, restart to use its new code." % f)
+        try:
+            newGraph = DependencyGraph(select())
+        except Exception:
+            traceback.print_exc()
+            print("Couldn't load the database, fix the error and save again.")
+            continue
+        keys = [k for k in newGraph.affected(changed)]
+        keys += sorted(k for k in newGraph.entries
+                       if not k in graph.entries and not k in keys)
+        graph = newGraph
+        if keys:
+            print("Rebuilding %d component(s) affected by: %s" %
+                  (len(keys), ", ".join(os.path.relpath(f) for f in sorted(changed))))
+            runIsolated(build, [graph.entries[k] for k in keys], True)
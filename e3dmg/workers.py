@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+#
+# A process pool for builds. Unlike `multiprocessing.Pool`, workers
+# are recycled depending on their memory usage: OCC and FreeCAD don't
+# always release memory, so a worker that exceeds a memory ceiling
+# exits after finishing its current task and a fresh worker takes its
+# place. Crashed workers (ex: segfault in OCC) are replaced as well.
+#
+# Workers report the stage of their current task with `setStage()`. A
+# watchdog in the pool kills workers that exceed the per-task or
+# per-stage timeout, since a stuck OCC operation (ex: a fillet) can't
+# be interrupted from inside the process.
+#
+# Each worker sends its results through its own pipe. A worker killed
+# while it's sending can only break its own pipe, a shared queue would
+# be left locked and hang all other workers.
+#
+
+import os, sys, gc, time, signal, traceback, multiprocessing
+
+try:
+    from multiprocessing.connection import wait
+except ImportError: # python 2
+    import select
+    def wait(connections, timeout=None):
+        """Returns connections that are ready to be read."""
+        return select.select(connections, [], [], timeout)[0]
+
+def memoryUsage():
+    """Returns current resident memory of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        # not linux, use peak memory instead
+        import resource
+        r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return r if sys.platform == 'darwin' else r * 1024
+
+_reporter = None # (results pipe, worker id) in worker processes
+
+def setStage(name):
+    """Reports the stage of the current task to the pool. Does nothing
+    when not called from a worker process."""
+    if _reporter is not None:
+        results, wid = _reporter
+        results.send((wid, 'stage', name, None))
+
+def workerMain(wid, func, tasks, results, maxMemory):
+    """Main function of worker processes."""
+    global _reporter
+    _reporter = (results, wid)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        try:
+            status, result = 'done', func(task)
+        except Exception:
+            status, result = 'failed', traceback.format_exc()
+        gc.collect()
+        # the pool must know that this worker exits together with the
+        # result, otherwise it may give it another task meanwhile
+        memory = memoryUsage() if maxMemory else None
+        recycle = memory if memory and memory > maxMemory else None
+        results.send((wid, status, result, recycle))
+        if recycle:
+            break
+
+class Worker(object):
+    def __init__(self, wid, func, maxMemory):
+        self.wid = wid
+        self.tasks = multiprocessing.Queue()
+        self.results, writer = multiprocessing.Pipe(duplex=False)
+        self.task = None # current task
+        self.dead = False # found dead once
+        self.stage = None # stage of current task
+        self.started = None # start time of current task
+        self.stageStarted = None # start time of current stage
+        self.process = multiprocessing.Process(
+            target=workerMain, args=(wid, func, self.tasks, writer, maxMemory))
+        self.process.daemon = True
+        self.process.start()
+        # only the worker writes, its end is closed when it exits
+        writer.close()
+
+class WorkerPool(object):
+    """Runs a function for each task in worker processes.
+
+    `func` : function to run, takes a task and returns a result, must
+             be picklable or defined before the pool is created
+    `processes` : number of worker processes
+    `maxMemory` : memory ceiling of a worker in bytes, a worker that
+                  uses more memory than this is replaced by a new one
+                  after finishing its current task
+    `timeout` : seconds a task may run, the worker running it is
+                killed and replaced if it takes longer
+    `stageTimeouts` : dictionary of stage name to seconds a stage
+                      (see `setStage`) may run
+    """
+
+    def __init__(self, func, processes=1, maxMemory=None,
+                 timeout=None, stageTimeouts=None):
+        self.func = func
+        self.processes = processes
+        self.maxMemory = maxMemory
+        self.timeout = timeout
+        self.stageTimeouts = stageTimeouts or {}
+        self.workers = {}
+        self.nextId = 0
+        self.recycled = 0
+        self.timedOut = 0
+
+    def _startWorker(self):
+        w = Worker(self.nextId, self.func, self.maxMemory)
+        self.workers[w.wid] = w
+        self.nextId += 1
+        return w
+
+    def _stopWorker(self, w):
+        del self.workers[w.wid]
+        w.process.join(5)
+        if w.process.is_alive():
+            w.process.terminate()
+            w.process.join()
+        w.results.close()
+
+    def _killWorker(self, w):
+        del self.workers[w.wid]
+        w.process.terminate()
+        w.process.join(5)
+        if w.process.is_alive():
+            os.kill(w.process.pid, signal.SIGKILL)
+            w.process.join()
+        w.results.close()
+
+    def run(self, tasks, callback):
+        """Runs all tasks. Tasks are taken from the iterable only when
+        there is an idle worker. Iterable may yield `None` if no task is
+        ready yet, it's asked again after running tasks report.
+
+        `callback` : called in this process for every finished task as
+                     `callback(task, ok, result)`, `result` is the
+                     return value of `func` or the error message if
+                     `ok` is False
+        """
+        tasks = iter(tasks)
+        exhausted = False
+        for i in range(self.processes):
+            self._startWorker()
+
+        try:
+            while True:
+                # give tasks to idle workers
+                for w in list(self.workers.values()):
+                    if w.task is None and not exhausted:
+                        try:
+                            task = next(tasks)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        if task is None: # not ready, ask later
+                            break
+                        w.task = task
+                        w.stage = None
+                        w.started = w.stageStarted = time.time()
+                        w.tasks.put(w.task)
+                if exhausted and not any(w.task is not None
+                                         for w in self.workers.values()):
+                    break
+
+                ready = wait([w.results for w in self.workers.values()], 1)
+                if not ready:
+                    self._checkCrashed(callback)
+                    self._checkTimeouts(callback)
+                    continue
+
+                for w in list(self.workers.values()):
+                    if w.results in ready and w.wid in self.workers:
+                        self._receive(w, callback)
+                self._checkTimeouts(callback)
+        finally:
+            for w in list(self.workers.values()):
+                w.tasks.put(None)
+            for w in list(self.workers.values()):
+                self._stopWorker(w)
+
+    def _receive(self, w, callback):
+        """Handles a message of a worker."""
+        try:
+            wid, status, result, recycle = w.results.recv()
+        except (EOFError, IOError, OSError): # exited, messages are all read
+            self._replaceCrashed(w, callback)
+            return
+        if status == 'stage':
+            w.stage = result
+            w.stageStarted = time.time()
+            return
+        task, w.task = w.task, None
+        if recycle:
+            print("Recycling worker %d, memory usage %.0fMB exceeds the limit." %
+                  (wid, recycle/1e6))
+            self._stopWorker(w)
+            self._startWorker()
+            self.recycled += 1
+        if status == 'failed' and w.stage:
+            result = "failed in stage '%s':\n%s" % (w.stage, result)
+        callback(task, status == 'done', result)
+
+    def _replaceCrashed(self, w, callback):
+        task = w.task
+        self._stopWorker(w)
+        self._startWorker()
+        if task is not None:
+            callback(task, False, "worker crashed with exit code %s" %
+                     w.process.exitcode)
+
+    def _checkCrashed(self, callback):
+        """Replaces workers that died while running a task."""
+        for w in list(self.workers.values()):
+            if w.task is not None and not w.process.is_alive():
+                # its last messages may still be on the way, wait once
+                if not w.dead:
+                    w.dead = True
+                    continue
+                self._replaceCrashed(w, callback)
+
+    def _checkTimeouts(self, callback):
+        """Kills and replaces workers that exceed a timeout."""
+        now = time.time()
+        for w in list(self.workers.values()):
+            if w.task is None:
+                continue
+            limit = self.stageTimeouts.get(w.stage)
+            if limit and now - w.stageStarted > limit:
+                reason = "timed out in stage '%s' after %d seconds" % \
+                         (w.stage, limit)
+            elif self.timeout and now - w.started > self.timeout:
+                reason = "timed out after %d seconds in stage '%s'" % \
+                         (self.timeout, w.stage)
+            else:
+                continue
+            print("Killing worker %d, task %s." % (w.wid, reason))
+            task = w.task
+            self._killWorker(w)
+            self._startWorker()
+            self.timedOut += 1
+            callback(task, False, reason)
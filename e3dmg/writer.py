@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# A background thread for writing output files. Exporters serialize
+# models into bytes and hand them to the writer, which flushes them
+# to disk while the next model is generated. The queue of pending
+# files is bounded; if the writer falls behind, `write()` blocks until
+# there is room (backpressure), so memory use stays limited.
+#
+
+import os, socket, hashlib, threading, traceback
+from e3dmg.distribute import makedirs
+
+try:
+    import queue
+except ImportError: # python 2
+    import Queue as queue
+
+def writeFileAtomic(filename, data):
+    """Writes data to a file through a temporary file and syncs it to
+    the disk. Returns SHA1 hash of the data."""
+    makedirs(os.path.dirname(filename))
+    tmp = "%s.tmp-%s-%d" % (filename, socket.gethostname(), os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return hashlib.sha1(data).hexdigest()
+
+class PendingWrite(object):
+    """Result of a write that is queued to the background writer."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        """Waits until the file is written, returns SHA1 hash of it."""
+        self.event.wait()
+        if self.error:
+            raise Exception("Failed to write '%s':\n%s" % (self.filename, self.error))
+        return self.result
+
+class BackgroundWriter(object):
+    """Writes files in a background thread.
+
+    `maxPending` : maximum number of files waiting to be written
+    """
+
+    def __init__(self, maxPending=8):
+        self.queue = queue.Queue(maxPending)
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            pending, data = item
+            try:
+                pending.result = writeFileAtomic(pending.filename, data)
+            except Exception:
+                pending.error = traceback.format_exc()
+            pending.event.set()
+
+    def write(self, filename, data):
+        """Queues data to be written to a file atomically, blocks if the
+        queue is full. Returns a `PendingWrite`."""
+        pending = PendingWrite(filename)
+        self.queue.put((pending, data))
+        return pending
+
+    def close(self):
+        """Waits for the pending files and stops the writer thread."""
+        self.queue.put(None)
+        self.thread.join()
+
+_writer = None # (pid, BackgroundWriter)
+
+def processWriter(maxPending=8):
+    """Returns the background writer of current process. A writer is
+    created for each process since threads don't survive a fork."""
+    global _writer
+    if _writer is None or _writer[0] != os.getpid():
+        _writer = (os.getpid(), BackgroundWriter(maxPending))
+    return _writer[1]
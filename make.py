@@ -23,9 +23,21 @@
 #
 # Run `./make.py --help` for usage instructions.
 
-from e3dmg.exporters import export
-from e3dmg.dbutils import getGenerator, getAllAt
-import sys, argparse, os
+from e3dmg.exporters import exportScales
+from e3dmg.dbutils import getGenerator, iterAllAt
+from e3dmg.preflight import preflight, printInvalid
+from e3dmg.distribute import componentKey, parseShard, inShard, WorkQueue, makedirs
+from e3dmg.journal import BuildJournal, fileHash, syncFile
+from e3dmg.workers import WorkerPool, setStage
+from e3dmg.output import DirectoryOutput, ArchiveOutput, ARCHIVE_FORMATS
+from e3dmg.writer import PendingWrite, processWriter
+from e3dmg.dedup import ModelRegistry, modelFingerprint
+from e3dmg.cache import ModelCache
+from e3dmg.watch import watch
+from e3dmg.index import ModelIndex, modelInfo
+from e3dmg.catalog import Catalog
+from e3dmg.progress import Progress, BuildHistory
+import sys, argparse, os, socket, traceback, time
 
 def initParser():
     """Initializes and returns argument parser."""
@@ -54,11 +66,64 @@ Create models for all components:
 
 Create STEP files for all components:
     %(prog)s --step all
+
+Check parameters of all components without creating models:
+    %(prog)s --validate
+
+Build 2nd quarter of the database (ex: on the 2nd of 4 machines):
+    %(prog)s --shard 2/4 all
+
+Build with several machines pulling work from a shared directory:
+    %(prog)s --queue /shared/queue --outdir /shared/output all
+
+Continue an interrupted build, skipping already completed outputs:
+    %(prog)s --resume all
+
+Build with 4 processes, recycle processes that use more than 2GB memory:
+    %(prog)s --jobs 4 --max-memory 2000 all
+
+Create STEP files in millimeters and VRML files in 1/10 inch (KiCad) scale:
+    %(prog)s --step --vrml --scales 1,0.3937 all
+
+Write models into zip files of at most 500MB, see `e3dmg/output.py`:
+    %(prog)s --archive zip --archive-size 500 all
+
+Create X3D files with levels of detail, reduced level has 10%% of triangles:
+    %(prog)s --x3d --lod 0.1 all
+
+Create STEP files of only the pins, for footprint checks:
+    %(prog)s --step --parts pins all
+
+Reuse models generated by earlier builds, unless their generator changed:
+    %(prog)s --cache ~/.cache/e3dmg all
+
+Rebuild QFP models whenever their database or generator code is saved:
+    %(prog)s --watch qfp
+
+List QFN packages with 0.5mm pitch and more than 32 pins:
+    %(prog)s --query "module LIKE 'qfn%%' AND pitch = 0.5 AND pins > 32" --list-all
+
+Create STEP files of all packages taller than 3mm:
+    %(prog)s --step --query "height > 3"
+
+Give up on components that take longer than 10 minutes, or 5 minutes
+to generate the model:
+    %(prog)s --timeout 600 --stage-timeout generate=300 all
+
+Build in CI with 4 jobs, printing progress every minute:
+    %(prog)s --jobs 4 --progress-interval 60 all
         """)
     parser.add_argument('--list-all', action='store_true',
                         help="list all database")
     parser.add_argument('--list', metavar='MODULE',
                         help="list generators under given module path")
+    parser.add_argument('--query', metavar='CONDITION',
+                        help="select components with a SQL condition on the "
+                        "catalog instead of a component name, see e3dmg/catalog.py")
+    parser.add_argument('--catalog', default='catalog.db', metavar='FILE',
+                        help="catalog file for --query (default: %(default)s)")
+    parser.add_argument('--validate', action='store_true',
+                        help="only check parameters of components (all by default)")
     parser.add_argument('--step', action='store_true',
                         help="generate a STEP file")
     parser.add_argument('--vrml', action='store_true',
@@ -71,10 +136,88 @@ Create STEP files for all components:
                         help="generate a FreeCAD file")
     parser.add_argument('--dont-fuse', action='store_true',
                         help="do not fuse model to a single part/mesh")
+    parser.add_argument('--parts', default=None, type=parseNames,
+                        metavar='NAME1,NAME2,...',
+                        help="export only the parts with given names, ex: pins. "
+                        "Other parts aren't built if the generator defers them")
+    parser.add_argument('--precision', default=None, type=int, metavar='N',
+                        help="number of decimals of X3D and VRML coordinates "
+                        "(default: 6 for X3D, 3 for VRML)")
+    parser.add_argument('--trim-zeros', action='store_true',
+                        help="remove trailing zeros of X3D and VRML coordinates, "
+                        "files are smaller but take longer to write")
+    parser.add_argument('--x3d-triangles', action='store_true',
+                        help="write X3D meshes as IndexedTriangleSet")
+    parser.add_argument('--lod', default=None, type=parseRatio, metavar='RATIO',
+                        help="add levels of detail to X3D and VRML files: full, "
+                        "reduced to RATIO of triangles and bounding boxes")
+    parser.add_argument('--lod-files', action='store_true',
+                        help="write levels of detail into separate NAME_lod1 and "
+                        "NAME_lod2 files instead of LOD nodes")
     parser.add_argument('--outdir', default='./output',
                         help="output directory of models")
     parser.add_argument('--scale', default=None, type=float,
                         help="scale output model")
+    parser.add_argument('--scales', default=None, type=parseScales,
+                        metavar='S1,S2,...',
+                        help="output the model in several scales, each into "
+                        "a 'scale_S' sub directory of output directory")
+    parser.add_argument('--archive', choices=ARCHIVE_FORMATS,
+                        help="write models into archive shards in output directory "
+                        "instead of a directory tree")
+    parser.add_argument('--archive-size', default=1000, type=float, metavar='MB',
+                        help="size limit of an archive shard (default: %(default)s)")
+    parser.add_argument('--shard', metavar='I/N',
+                        help="build only I'th of N parts of the selected components")
+    parser.add_argument('--queue', metavar='DIR',
+                        help="pull components from a work queue in a (shared) directory")
+    parser.add_argument('--lease', default=3600, type=float, metavar='SECONDS',
+                        help="queue lease duration, leases are renewed while building, "
+                        "a component of a machine that stops renewing for this long "
+                        "is taken over by other machines (default: %(default)s)")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip outputs completed by previous runs (see build journal)")
+    parser.add_argument('--jobs', default=1, type=int, metavar='N',
+                        help="number of worker processes (default: %(default)s)")
+    parser.add_argument('--max-memory', default=None, type=float, metavar='MB',
+                        help="replace a worker process with a new one if its "
+                        "memory usage exceeds this after a component")
+    parser.add_argument('--dedup', action='store_true',
+                        help="don't export models identical to earlier ones, link "
+                        "their outputs instead (see e3dmg/dedup.py)")
+    parser.add_argument('--no-index', action='store_true',
+                        help="don't update the model index, OUTDIR/index.json "
+                        "(see e3dmg/index.py)")
+    parser.add_argument('--index-meshes', action='store_true',
+                        help="add triangle and vertex counts of parts to the model "
+                        "index, parts are tessellated once more for this")
+    parser.add_argument('--no-progress', action='store_true',
+                        help="don't show build progress")
+    parser.add_argument('--progress-interval', default=30, type=float,
+                        metavar='SECONDS',
+                        help="seconds between progress lines when output isn't "
+                        "a terminal (default: %(default)s)")
+    parser.add_argument('--cache', metavar='DIR',
+                        help="keep generated models in a cache directory and "
+                        "reuse them when generator and its parameters didn't "
+                        "change (see e3dmg/cache.py)")
+    parser.add_argument('--cache-size', default=5000, type=float, metavar='MB',
+                        help="size limit of the model cache (default: %(default)s)")
+    parser.add_argument('--pipeline', default=0, type=int, metavar='N',
+                        help="write X3D and VRML files in a background thread while "
+                        "next model is generated, with at most N files waiting")
+    parser.add_argument('--timeout', default=None, type=float, metavar='SECONDS',
+                        help="kill and fail a component if it takes longer than this")
+    parser.add_argument('--stage-timeout', action='append', default=[],
+                        metavar='STAGE=SECONDS',
+                        help="timeout of a stage of a component build, stages are: "
+                        "%s (can be given multiple times)" % ", ".join(STAGES))
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running and rebuild components when their "
+                        "database or generator files change")
+    parser.add_argument('--debounce', default=1., type=float, metavar='SECONDS',
+                        help="with --watch, wait until files are unchanged for "
+                        "this long before rebuilding (default: %(default)s)")
     parser.add_argument('component', nargs='?',
                         help="component model to generate or 'all'")
     return parser
@@ -86,51 +229,449 @@ def listDatabase(module=None):
     else:
         module = 'e3dmg.database.' + module
 
-    for cg in getAllAt(module):
+    for cg in iterAllAt(module):
         print(cg['package'].split('e3dmg.database.')[1] + ':' + cg['name'])
 
-def makeOne(args, name, generator, package):
+# command line option, exporter file type and file extension of outputs
+FORMATS = [
+    ('step', "STEP", '.step'),
+    ('vrml', "VRML", '.wrl'),
+    ('s_vrml', "S_VRML", '.wrl'),
+    ('x3d', "X3D", '.x3d'),
+    ('freecad', "FREECAD", '.fcstd'),
+]
+
+# file types that are serialized in memory and can be written in background
+SERIALIZED = ["X3D", "S_VRML", "VRML"]
+
+# stages of a component build, reported to the worker pool for timeouts
+STAGES = ['generate', 'export']
+
+def parseStageTimeouts(values):
+    """Parses a list of 'stage=seconds' strings into a dictionary."""
+    timeouts = {}
+    for value in values:
+        stage, _, seconds = value.partition('=')
+        if stage not in STAGES:
+            raise Exception("Unknown stage '%s', valid stages are: %s" %
+                            (stage, ", ".join(STAGES)))
+        try:
+            timeouts[stage] = float(seconds)
+        except ValueError:
+            raise Exception("Invalid stage timeout: '%s'" % value)
+    return timeouts
+
+def parseScales(value):
+    """Parses comma separated list of scale factors."""
+    try:
+        return [float(s) for s in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid scale list: '%s'" % value)
+
+def parseNames(value):
+    """Parses comma separated list of names."""
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+def parseRatio(value):
+    """Parses a ratio between 0 and 1."""
+    try:
+        ratio = float(value)
+    except ValueError:
+        ratio = None
+    if ratio is None or not 0 < ratio <= 1:
+        raise argparse.ArgumentTypeError("invalid ratio: '%s'" % value)
+    return ratio
+
+def outputScales(args):
+    """Returns a list of (scale, sub directory) tuples."""
+    if args.scales:
+        return [(s, ['scale_%g' % s]) for s in args.scales]
+    return [(args.scale, [])]
+
+def outputLevels(args, ftype):
+    """Returns a list of (level of detail, file name suffix) tuples of
+    a file type. Level is `None` for files that contain all levels."""
+    if args.lod and args.lod_files and ftype in SERIALIZED:
+        return [(0, ''), (1, '_lod1'), (2, '_lod2')]
+    return [(None, '')]
+
+def outputOptions(args, scale, level=None):
+    """Returns options that affect output files, recorded in journal."""
+    options = {'fuse': not args.dont_fuse, 'scale': scale}
+    if args.parts:
+        options['parts'] = args.parts
+    options.update(formatOptions(args))
+    if level is not None:
+        options['level'] = level
+    return options
+
+def formatOptions(args):
+    """Returns mesh format options of exporters that are set."""
+    options = {}
+    if args.precision is not None:
+        options['precision'] = args.precision
+    if args.x3d_triangles:
+        options['triangles'] = True
+    if args.trim_zeros:
+        options['trim'] = True
+    if args.lod:
+        options['lod'] = args.lod
+    return options
+
+def planOutputs(args, entry, output, journal=None):
+    """Returns a list of (file type, filename, scale, level of detail)
+    of the outputs of a component. When resuming, outputs completed before are
+    excluded.
+
+    `output` : output backend, see `e3dmg/output.py`
+    """
+    package = entry['package'][len('e3dmg.database.'):]
+
+    outputs = []
+    for scale, subdir in outputScales(args):
+        name = '/'.join(subdir + package.split('.') + [entry['name']])
+        outputs += [(ftype, output.path(name+suffix+ext), scale, level)
+                    for option, ftype, ext in FORMATS if getattr(args, option)
+                    for level, suffix in outputLevels(args, ftype)]
+    if journal and args.resume:
+        component = componentKey(entry)
+        outputs = [o for o in outputs
+                   if not journal.isDone(component, o[0], o[1],
+                                         outputOptions(args, *o[2:]), output.hash)]
+    return outputs
+
+def makeOne(args, name, generator, package, outputs, writer=None, registry=None,
+            generated=None, cache=None):
     """
     `args` : argument parser result
     `name` : name of the component
     `generator` : generator object
     `package` : component database path
+    `outputs` : list of (file type, filename, scale, level) to create
+    `writer` : `BackgroundWriter` for serialized outputs
+    `registry` : `ModelRegistry` to look for identical earlier models
+    `generated` : function to call after the model is generated
+    `cache` : `ModelCache` to load the model from or store it
+
+    Returns a dictionary of model 'fingerprint' (if `registry` is
+    given), 'cached' (`True` if model is loaded from `cache`), 'info'
+    (model index record, `None` if `--no-index`), 'seconds' (build
+    time) and 'outputs', a list of (file type, filename, scale, level,
+    SHA1 hash, source) tuples. Outputs given to the `writer` have a
+    `PendingWrite` instead of hash, see `waitWrites`. If an output is
+    identical to an earlier one, it's not exported and `source` is
+    the registry record of the earlier output.
     """
     print("Making %s:%s..." % (package, name))
-    model = generator.generate()
+    start = time.time()
+    setStage('generate')
+    model = cache.load(generator, args.parts) if cache else None
+    cached = model is not None
+    if not cached:
+        model = generator.generate()
+        if cache: cache.store(generator, model, args.parts)
+    if args.parts:
+        names = model.partNames()
+        model = model.select(args.parts)
+        if not model.partNames():
+            raise Exception("Model has none of the parts %s, its parts are: %s" %
+                            (", ".join(args.parts), ", ".join(map(str, names))))
+    if generated: generated()
 
-    # create output directory if it doesn't exist
-    odir = os.path.abspath(args.outdir)
-    odir = '/'.join(odir.split('/') + package[len('e3dmg.database.'):].split('.'))
-    if not os.path.exists(odir):
-        os.makedirs(odir)
-
-    fname = odir+'/'+name
     fuse = not args.dont_fuse
-    if args.step:
-        export("STEP", name, model, fname+'.step', fuse, args.scale)
-    if args.vrml:
-        export("VRML", name, model, fname+'.wrl', fuse, args.scale)
-    if args.s_vrml:
-        export("S_VRML", name, model, fname+'.wrl', fuse, args.scale)
-    if args.x3d:
-        export("X3D", name, model, fname+'.x3d', fuse, args.scale)
-    if args.freecad:
-        export("FREECAD", name, model, fname+'.fcstd', fuse, args.scale)
+    done = []
+    setStage('export')
+    fingerprint = None
+    if registry:
+        fingerprint = modelFingerprint(model)
+        component = "%s:%s" % (package[len('e3dmg.database.'):], name)
+        remaining = []
+        for ftype, filename, scale, level in outputs:
+            source = registry.lookup(fingerprint, ftype,
+                                     outputOptions(args, scale, level), component)
+            if source:
+                print("%s is identical to %s" % (filename, source['component']))
+                done.append((ftype, filename, scale, level, source['sha1'], source))
+            else:
+                remaining.append((ftype, filename, scale, level))
+        outputs = remaining
+
+    ftypes = []
+    for o in outputs:
+        if not o[0] in ftypes: ftypes.append(o[0])
+
+    for ftype in ftypes:
+        # all scales of a file type are exported at once
+        targets = [(filename, scale) if level is None else (filename, scale, level)
+                   for t, filename, scale, level in outputs if t == ftype]
+        if writer and ftype in SERIALIZED:
+            pending = {}
+            exportScales(ftype, name, model, targets, fuse,
+                         lambda f, data: pending.__setitem__(f, writer.write(f, data)),
+                         **formatOptions(args))
+            hashes = [pending[t[0]] for t in targets]
+        else:
+            hashes = exportAtomic(ftype, name, model, targets, fuse,
+                                  formatOptions(args))
+        done += [(ftype, t[0], t[1], t[2] if len(t) > 2 else None, sha1, None)
+                 for t, sha1 in zip(targets, hashes)]
+    info = None if args.no_index else modelInfo(generator, model, args.index_meshes)
     print("Done %s:%s..." % (package, name))
+    return {'fingerprint': fingerprint, 'cached': cached, 'info': info,
+            'seconds': time.time() - start, 'outputs': done}
+
+def waitWrites(result):
+    """Waits for the background writes of a `makeOne` result. Returns
+    the result with hashes of written files."""
+    outputs = [(ftype, filename, scale, level,
+                sha1.wait() if isinstance(sha1, PendingWrite) else sha1, source)
+               for ftype, filename, scale, level, sha1, source in result['outputs']]
+    return dict(result, outputs=outputs)
+
+def exportAtomic(ftype, name, model, targets, fuse, options={}):
+    """Exports the model to temporary directories next to output files
+    and moves them to their place. Thus a half written file never
+    appears and concurrent builds of the same component don't corrupt
+    the output.
+
+    `targets` : list of (filename, scale) or (filename, scale, level)
+                tuples
+    `options` : other options of `exportScales`
 
-def make(args):
-    component = args.component
+    Returns SHA1 hashes of the output files.
+    """
+    tmpname = ".tmp-%s-%d" % (socket.gethostname(), os.getpid())
+    tmps = []
+    for target in targets:
+        odir, fname = os.path.split(target[0])
+        tmpdir = os.path.join(odir, tmpname)
+        makedirs(tmpdir)
+        tmps.append(os.path.join(tmpdir, fname))
+    try:
+        exportScales(ftype, name, model,
+                     [(tmp,) + tuple(t[1:]) for tmp, t in zip(tmps, targets)], fuse,
+                     **options)
+        hashes = []
+        for tmp, target in zip(tmps, targets):
+            hashes.append(fileHash(tmp))
+            syncFile(tmp)
+            os.rename(tmp, target[0])
+        return hashes
+    finally:
+        # files of several levels of detail share a directory
+        for tmp in tmps:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        for tmp in tmps:
+            if os.path.isdir(os.path.dirname(tmp)):
+                os.rmdir(os.path.dirname(tmp))
+
+def selectGenerators(component):
+    """Returns an iterable of database entries for given component
+    argument: 'all', a module path or a single component."""
     if component == 'all': # make whole database
-        generators = getAllAt('e3dmg.database')
+        return iterAllAt('e3dmg.database')
     elif not (':' in component): # make sub package/path
-        generators = getAllAt('e3dmg.database.' + component)
+        return iterAllAt('e3dmg.database.' + component)
     else: # make single component
         module, part = component.split(':')
-        generators = [getGenerator('e3dmg.database.' + module, part)]
+        return [getGenerator('e3dmg.database.' + module, part)]
+
+def queryCatalog(args):
+    """Returns a list of (module, name) of components that match the
+    query option, catalog is refreshed first."""
+    catalog = Catalog(args.catalog)
+    try:
+        catalog.refresh()
+        return catalog.query(args.query)
+    finally:
+        catalog.close()
+
+def selectEntries(args):
+    """Returns an iterable of database entries to build, considering
+    the query and shard options."""
+    if args.query:
+        entries = (getGenerator('e3dmg.database.' + module, name)
+                   for module, name in queryCatalog(args))
+    else:
+        entries = selectGenerators(args.component)
+    if args.shard:
+        index, count = parseShard(args.shard)
+        entries = inShard(entries, index, count)
+    return entries
+
+def validate(entries, processes=None):
+    """Checks parameters of components in parallel and prints invalid
+    ones. Returns `True` if all components are valid."""
+    checked, invalid = preflight(entries, processes)
+    printInvalid(invalid)
+    print("%d components checked, %d invalid." % (checked, len(invalid)))
+    return not invalid
+
+def make(args, entries=None):
+    """Builds components selected by `args`, or given list of database
+    `entries`."""
+    # selected once, so that checked and built components are the same
+    # even if the database (or catalog) changes meanwhile
+    entries = list(selectEntries(args) if entries is None else entries)
+    components = [componentKey(e) for e in entries] # for progress
 
-    for g in generators:
-        makeOne(args, g['name'], g['generator'], g['package'])
+    # don't start if any of the components has invalid parameters
+    processes = 1 if ':' in (args.component or '') else None
+    if not validate(entries, processes):
+        sys.exit("Build cancelled, fix invalid components first!")
+
+    queue = None
+    if args.queue:
+        queue = WorkQueue(args.queue, args.lease)
+        entries = queue.claimed(entries)
+
+    makedirs(args.outdir)
+    journal = BuildJournal(args.outdir, args.resume)
+    if args.archive:
+        output = ArchiveOutput(args.outdir, args.archive, args.archive_size*1e6)
+    else:
+        output = DirectoryOutput(args.outdir)
+    registry = ModelRegistry(args.outdir, output) if args.dedup else None
+    cache = ModelCache(args.cache, args.cache_size*1e6) if args.cache else None
+    index = None if args.no_index else ModelIndex(args.outdir)
+    history = BuildHistory(args.outdir)
+    progress = None
+    if not args.no_progress:
+        # claimed components of a work queue aren't known beforehand
+        progress = Progress(None if queue else components, history.times,
+                            args.progress_interval)
+    failed = []
+    cached = [0, 0] # models loaded from cache, built models
+    deduped = [0, 0, 0] # outputs, linked outputs, saved bytes
+
+    def tasks():
+        for g in entries:
+            if g is None: # nothing to claim from the queue for now
+                yield None
+                continue
+            outputs = planOutputs(args, g, output, journal)
+            if outputs:
+                yield g, outputs
+            else:
+                print("Skipping %s, already done." % componentKey(g))
+                if progress: progress.skip(componentKey(g))
+                if queue: queue.done(componentKey(g))
+
+    def build(task, generated=None):
+        g, outputs = task
+        writer = processWriter(args.pipeline) if args.pipeline else None
+        return makeOne(args, g['name'], g['generator'], g['package'], outputs,
+                       writer, registry, generated, cache)
+
+    def buildAndWait(task):
+        return waitWrites(build(task))
+
+    def finished(task, ok, result):
+        component = componentKey(task[0])
+        if ok:
+            cached[0] += result['cached']
+            cached[1] += 1
+            records = []
+            for ftype, filename, scale, level, sha1, source in result['outputs']:
+                options = outputOptions(args, scale, level)
+                if source:
+                    location = output.alias(filename, source['location'])
+                    deduped[1] += 1
+                    deduped[2] += source['size']
+                else:
+                    location = output.store(filename)
+                    if registry:
+                        registry.add(result['fingerprint'], component, ftype, options,
+                                     location, sha1, output.size(location))
+                deduped[0] += 1
+                journal.record(component, ftype, filename, sha1, options,
+                               location if location != filename else None)
+                if index:
+                    records.append(index.output(ftype, location, scale, level, sha1,
+                                                output.size(location)))
+            if index:
+                index.add(component, result['info'], records)
+            if not result['cached']:
+                history.record(component, result['seconds'])
+        else:
+            print("Failed %s:\n%s" % (component, result))
+            failed.append((component, result.strip().splitlines()[-1]))
+        if queue: queue.done(component, failed=not ok)
+        if progress: progress.finished(component, ok, ok and result['cached'])
+
+    def finishWrites(task, ok, result):
+        if ok:
+            try:
+                result = waitWrites(result)
+            except Exception:
+                result, ok = traceback.format_exc(), False
+        finished(task, ok, result)
+
+    stageTimeouts = parseStageTimeouts(args.stage_timeout)
+    if progress: progress.start()
+    if queue: queue.startRenewal()
+    try:
+        # timeouts can only be enforced by killing worker processes
+        if args.jobs > 1 or args.max_memory or args.timeout or stageTimeouts:
+            maxMemory = args.max_memory*1e6 if args.max_memory else None
+            pool = WorkerPool(buildAndWait, args.jobs, maxMemory,
+                              args.timeout, stageTimeouts)
+            pool.run(tasks(), finished)
+        else:
+            # with --pipeline, files of a component are written while
+            # next one is generated, they are finished before next one
+            # is exported so that it can be deduplicated against it.
+            # Components of a work queue are finished before claiming
+            # next one, other machines may be waiting for them.
+            defer = args.pipeline and not queue
+            previous = []
+            def finishPrevious():
+                if previous: finishWrites(*previous.pop())
+            for task in tasks():
+                if task is None:
+                    continue
+                try:
+                    result, ok = build(task, finishPrevious), True
+                except Exception:
+                    result, ok = traceback.format_exc(), False
+                finishPrevious()
+                if defer:
+                    previous.append((task, ok, result))
+                else:
+                    finishWrites(task, ok, result)
+            finishPrevious()
+    finally:
+        if queue: queue.stopRenewal()
+        output.close()
+        journal.close()
+        if index:
+            index.update()
+        if progress: progress.stop()
+        history.save()
+
+    if registry:
+        print("Deduplication: %d of %d outputs were identical to earlier models, "
+              "%.1fMB saved." % (deduped[1], deduped[0], deduped[2]/1e6))
+
+    if cache:
+        print("Model cache: %d of %d models were loaded from cache." % tuple(cached))
+
+    if failed:
+        sys.exit("%d component(s) failed:\n%s" % (len(failed), "\n".join(
+            "  %s: %s" % f for f in failed)))
+
+def watchBuild(args):
+    """Builds components and rebuilds them when their source files
+    change."""
+    def build(entries, rebuild):
+        if rebuild: # outputs of changed components must be replaced
+            args.resume = False
+        make(args, entries)
+    try:
+        watch(lambda: selectEntries(args), build, args.debounce)
+    except KeyboardInterrupt:
+        pass
 
 def run():
     parser = initParser()
@@ -139,6 +680,10 @@ def run():
     # check arguments
     if args.vrml and args.s_vrml:
         raise Exception("VRML and Simple VRML exporters cannot be selected at the same time!")
+    if args.scale and args.scales:
+        raise Exception("--scale and --scales cannot be used at the same time!")
+    if args.watch and (args.queue or args.shard):
+        raise Exception("--watch cannot be used with --queue or --shard!")
 
     # select all file types if none selected
     if not (args.step or args.vrml or args.s_vrml or args.x3d or args.freecad):
@@ -148,13 +693,23 @@ def run():
         args.x3d = True
         args.freecad = True
 
-    if args.list_all:
+    if args.list_all and args.query:
+        for module, name in queryCatalog(args):
+            print(module + ':' + name)
+        return
+    elif args.list_all:
         listDatabase()
         return
     elif args.list:
         listDatabase(args.list)
         return
-    elif args.component:
+    elif args.validate:
+        args.component = args.component or 'all'
+        processes = 1 if ':' in args.component else None
+        sys.exit(0 if validate(selectEntries(args), processes) else 1)
+    elif (args.component or args.query) and args.watch:
+        watchBuild(args)
+    elif args.component or args.query:
         make(args)
     else:
         parser.error("Provide a component name/module to create!")
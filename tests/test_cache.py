@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Tests of the model cache that don't need CAD libraries: cache keys,
+# misses and eviction of least recently used models.
+#
+
+import os, json, time, shutil, tempfile, unittest
+from e3dmg import Generator
+from e3dmg.cache import ModelCache, generatorKey
+
+class PadGen(Generator):
+
+    def __init__(self, pins, pitch=1.0):
+        self.pins = pins
+        self.pitch = pitch
+
+class ModelCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='e3dmg-test-')
+        self.cache = ModelCache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def add(self, generator, used, size=1000):
+        """Adds a cached model with a part file of `size` bytes."""
+        key = generatorKey(generator)
+        path = self.cache._dir(key)
+        os.makedirs(path)
+        with open(os.path.join(path, '0.brep'), 'wb') as f:
+            f.write(b'0' * size)
+        info = {'key': key, 'parts': [{'name': 'Body', 'color': None, 'file': '0.brep'}]}
+        with open(os.path.join(path, 'model.json'), 'w') as f:
+            json.dump(info, f)
+        os.utime(os.path.join(path, 'model.json'), (used, used))
+        return path
+
+    def testKey(self):
+        self.assertEqual(generatorKey(PadGen(4)), generatorKey(PadGen(4, 1.0)))
+        self.assertNotEqual(generatorKey(PadGen(4)), generatorKey(PadGen(8)))
+        self.assertNotEqual(generatorKey(PadGen(4)), generatorKey(PadGen(4, 0.5)))
+
+    def testMiss(self):
+        self.assertIsNone(self.cache.load(PadGen(4)))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+    def testEmptySelection(self):
+        self.add(PadGen(4), time.time())
+        self.assertIsNone(self.cache.load(PadGen(4), ['Pins']))
+        self.assertIsNone(self.cache.load(PadGen(4), []))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+    def testEvict(self):
+        now = time.time()
+        paths = [self.add(PadGen(n), now - 100 + n) for n in range(10)]
+        size = sum(e[1] for e in self.cache.entries())
+        self.cache.maxSize = size // 2
+        self.cache.evict()
+
+        self.assertTrue(self.cache.size <= self.cache.maxSize * 0.9)
+        self.assertEqual(self.cache.size, sum(e[1] for e in self.cache.entries()))
+        remaining = [os.path.exists(p) for p in paths]
+        # least recently used ones are removed
+        self.assertEqual(remaining, sorted(remaining))
+        self.assertTrue(remaining[-1] and not remaining[0])
+        self.assertEqual([d for d in os.listdir(self.path) if d.startswith('.')], [])
+
+    def testNoEviction(self):
+        now = time.time()
+        paths = [self.add(PadGen(n), now) for n in range(3)]
+        self.cache.maxSize = sum(e[1] for e in self.cache.entries())
+        self.cache.evict()
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Tests of the catalog: indexing a database package and refreshing
+# only its modified modules and tables. Test database is created in a
+# temporary directory that is added to the path of `e3dmg.database`.
+#
+
+import os, sys, time, shutil, tempfile, importlib, unittest
+import e3dmg.database
+from e3dmg import dbutils
+from e3dmg.catalog import Catalog
+
+PACKAGE = 'e3dmg.database.catalogtest'
+
+MODULE = """
+from e3dmg import Generator
+
+class PadGen(Generator):
+
+    def __init__(self, pins, pitch=1.0):
+        self.pins = pins
+        self.pitch = pitch
+
+    def dimensions(self):
+        return {'pins': self.pins, 'pitch': self.pitch}
+
+pad4 = PadGen(4)
+pad8 = PadGen(8, %s)
+"""
+
+TABLE = """name, generator, pins, pitch
+%s
+"""
+
+class CatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='e3dmg-test-')
+        self.pkgdir = os.path.join(self.root, 'catalogtest')
+        os.mkdir(self.pkgdir)
+        self.write('__init__.py', '')
+        self.write('parts.py', MODULE % 0.5)
+        self.write('pads.csv', TABLE % "\n".join(
+            "pad%d, %s.parts.PadGen, %d, 1.27" % (n, PACKAGE, n) for n in (14, 16)))
+        e3dmg.database.__path__.append(self.root)
+        self.catalog = Catalog(os.path.join(self.root, 'catalog.sqlite'))
+
+    def tearDown(self):
+        self.catalog.close()
+        e3dmg.database.__path__.remove(self.root)
+        self.forget()
+        sys.modules.pop(PACKAGE, None)
+        shutil.rmtree(self.root)
+
+    def forget(self):
+        """Forgets imported test modules, tables and generator
+        classes, as if the catalog is refreshed by a new process."""
+        for name in list(sys.modules):
+            if name.startswith(PACKAGE + '.'):
+                del sys.modules[name]
+        for path in list(dbutils._classes):
+            if path.startswith(PACKAGE + '.'):
+                del dbutils._classes[path]
+        for filename in list(dbutils._tables):
+            if filename.startswith(self.pkgdir):
+                del dbutils._tables[filename]
+
+    def write(self, name, text):
+        filename = os.path.join(self.pkgdir, name)
+        if os.path.exists(filename):
+            # make sure modification is visible, mtime may have a
+            # resolution of a second
+            mtime = os.path.getmtime(filename) + 10
+        else:
+            mtime = time.time()
+        with open(filename, 'w') as f:
+            f.write(text)
+        os.utime(filename, (mtime, mtime))
+        self.forget()
+        if hasattr(importlib, 'invalidate_caches'):
+            importlib.invalidate_caches()
+
+    def names(self, condition):
+        return [name for module, name in self.catalog.query(condition)]
+
+    def testRefresh(self):
+        self.assertEqual(self.catalog.refresh(PACKAGE), 4)
+        self.assertEqual(self.names("pins > 4"), ['pad14', 'pad16', 'pad8'])
+        self.assertEqual(self.catalog.query("pitch = 1.27"),
+                         [('catalogtest.pads', 'pad14'), ('catalogtest.pads', 'pad16')])
+        self.assertEqual(self.names("key IN (SELECT key FROM params "
+                                    "WHERE name = 'pitch' AND value < 1)"), ['pad8'])
+        # nothing is modified
+        self.assertEqual(self.catalog.refresh(PACKAGE), 0)
+
+    def testModifiedTable(self):
+        self.catalog.refresh(PACKAGE)
+        self.write('pads.csv', TABLE % "\n".join(
+            "pad%d, %s.parts.PadGen, %d, 1.27" % (n, PACKAGE, n) for n in (14, 16, 20)))
+        # only the table is indexed again
+        self.assertEqual(self.catalog.refresh(PACKAGE), 3)
+        self.assertEqual(self.names("pins > 4"), ['pad14', 'pad16', 'pad20', 'pad8'])
+
+    def testModifiedModule(self):
+        self.catalog.refresh(PACKAGE)
+        self.write('parts.py', MODULE % 0.65)
+        # table uses the generator of the module, thus it's indexed as well
+        self.assertEqual(self.catalog.refresh(PACKAGE), 4)
+        self.assertEqual(self.names("pitch = 0.65"), ['pad8'])
+        self.assertEqual(self.names("pitch = 0.5"), [])
+
+    def testRemovedTable(self):
+        self.catalog.refresh(PACKAGE)
+        os.remove(os.path.join(self.pkgdir, 'pads.csv'))
+        self.assertEqual(self.catalog.refresh(PACKAGE), 0)
+        self.assertEqual(self.names("pins > 0"), ['pad4', 'pad8'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Tests of the registry of duplicate models.
+#
+
+import os, shutil, tempfile, unittest
+from e3dmg.dedup import ModelRegistry
+from e3dmg.output import DirectoryOutput
+from e3dmg.journal import fileHash
+
+OPTIONS = {'fuse': True, 'scale': None}
+
+class ModelRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp(prefix='e3dmg-test-')
+        self.output = DirectoryOutput(self.outdir)
+        self.registry = ModelRegistry(self.outdir, self.output)
+        self.location = self.output.path('AKA.step')
+        with open(self.location, 'w') as f:
+            f.write('model')
+        self.registry.add('f1', 'qfp:AKA', 'STEP', OPTIONS, self.location,
+                          fileHash(self.location), 5)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def lookup(self, fingerprint='f1', ftype='STEP', options=OPTIONS,
+               component='qfp:ABD'):
+        return self.registry.lookup(fingerprint, ftype, options, component)
+
+    def testLookup(self):
+        r = self.lookup()
+        self.assertEqual(r['component'], 'qfp:AKA')
+        self.assertEqual(r['location'], self.location)
+
+    def testNoMatch(self):
+        self.assertIsNone(self.lookup(fingerprint='f2'))
+        self.assertIsNone(self.lookup(ftype='VRML'))
+        self.assertIsNone(self.lookup(options=dict(OPTIONS, scale=2.54)))
+        # the registered output itself
+        self.assertIsNone(self.lookup(component='qfp:AKA'))
+
+    def testModifiedOutput(self):
+        with open(self.location, 'w') as f:
+            f.write('another model')
+        self.assertIsNone(self.lookup())
+
+    def testRecordIsntReplaced(self):
+        self.registry.add('f1', 'qfp:ABD', 'STEP', OPTIONS, self.location,
+                          fileHash(self.location), 5)
+        self.assertEqual(self.lookup(component='qfp:ABE')['component'], 'qfp:AKA')
+
+    def testAlias(self):
+        r = self.lookup()
+        filename = self.output.alias(self.output.path('qfp/ABD.step'), r['location'])
+        with open(filename) as f:
+            self.assertEqual(f.read(), 'model')
+        self.assertEqual(self.output.hash(filename), r['sha1'])
+
+if __name__ == '__main__':
+    unittest.main()
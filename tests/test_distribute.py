@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Tests of the work queue: claiming, finishing, lease expiry and
+# renewal, and two consumers sharing a queue.
+#
+
+import os, time, shutil, tempfile, unittest
+from e3dmg.distribute import WorkQueue, componentKey
+
+def entry(name):
+    return dict(package='e3dmg.database.test', name=name, generator=None)
+
+class WorkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='e3dmg-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def queue(self, owner, lease=3600, poll=0.2):
+        # queues of a process share the owner name, give them their own
+        q = WorkQueue(self.path, lease, poll)
+        q.owner = owner
+        return q
+
+    def testClaimAndDone(self):
+        a, b = self.queue('a'), self.queue('b')
+        self.assertTrue(a.claim('test:A'))
+        self.assertFalse(b.claim('test:A'))
+        self.assertFalse(a.isDone('test:A'))
+        a.done('test:A')
+        self.assertTrue(b.isDone('test:A'))
+        self.assertFalse(b.claim('test:A'))
+        self.assertEqual(os.listdir(os.path.join(self.path, 'leases')), [])
+
+    def testLeaseExpiry(self):
+        a, b = self.queue('a', lease=0.2), self.queue('b', lease=0.2)
+        self.assertTrue(a.claim('test:A'))
+        self.assertFalse(b.claim('test:A'))
+        time.sleep(0.5)
+        self.assertTrue(b.claim('test:A'))
+        # taken over lease isn't renewed by its old owner
+        self.assertFalse(a.renew('test:A'))
+        self.assertTrue(b.renew('test:A'))
+
+    def testRenewal(self):
+        a, b = self.queue('a', lease=0.4), self.queue('b', lease=0.4)
+        self.assertTrue(a.claim('test:A'))
+        a.startRenewal()
+        try:
+            time.sleep(1)
+            self.assertFalse(b.claim('test:A'))
+        finally:
+            a.stopRenewal()
+        a.done('test:A')
+        self.assertEqual(a.held, set())
+
+    def testClaimedDoesntWaitWhileHolding(self):
+        entries = [entry('A'), entry('B')]
+        a, b = self.queue('a'), self.queue('b')
+        ca, cb = a.claimed(entries), b.claimed(entries)
+        self.assertEqual(componentKey(next(ca)), 'test:A')
+        self.assertEqual(componentKey(next(cb)), 'test:B')
+        # both hold a component the other one waits for
+        start = time.time()
+        self.assertIsNone(next(ca))
+        self.assertIsNone(next(cb))
+        self.assertLess(time.time() - start, a.poll)
+        a.done('test:A')
+        b.done('test:B')
+        self.assertEqual(list(ca), [])
+        self.assertEqual(list(cb), [])
+
+    def testClaimedAll(self):
+        entries = [entry(n) for n in 'ABCDEF']
+        a, b = self.queue('a'), self.queue('b')
+        ca, cb = a.claimed(entries), b.claimed(entries)
+        built = []
+        # consumers take turns, each one finishes its component first
+        while ca or cb:
+            for c, q in [(ca, a), (cb, b)]:
+                if c is None:
+                    continue
+                try:
+                    e = next(c)
+                except StopIteration:
+                    if c is ca: ca = None
+                    else: cb = None
+                    continue
+                if e is not None:
+                    built.append(componentKey(e))
+                    q.done(componentKey(e))
+        self.assertEqual(sorted(built), ['test:%s' % n for n in 'ABCDEF'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Tests of the build journal: recording outputs and resuming.
+#
+
+import os, socket, shutil, tempfile, unittest
+from e3dmg.journal import BuildJournal, fileHash
+
+OPTIONS = {'fuse': True, 'scale': None}
+
+class BuildJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp(prefix='e3dmg-test-')
+        self.output = os.path.join(self.outdir, 'AKA.step')
+        with open(self.output, 'w') as f:
+            f.write('model')
+        journal = BuildJournal(self.outdir)
+        journal.record('qfp:AKA', 'STEP', self.output, fileHash(self.output), OPTIONS)
+        journal.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def isDone(self, options=OPTIONS, resume=True):
+        journal = BuildJournal(self.outdir, resume)
+        try:
+            return journal.isDone('qfp:AKA', 'STEP', self.output, options)
+        finally:
+            journal.close()
+
+    def testResume(self):
+        self.assertTrue(self.isDone())
+
+    def testNotResumed(self):
+        self.assertFalse(self.isDone(resume=False))
+        # journal is started from scratch
+        self.assertFalse(self.isDone())
+
+    def testOptionsChanged(self):
+        self.assertFalse(self.isDone(dict(OPTIONS, scale=2.54)))
+
+    def testOutputChanged(self):
+        with open(self.output, 'w') as f:
+            f.write('modified')
+        self.assertFalse(self.isDone())
+
+    def testOutputRemoved(self):
+        os.remove(self.output)
+        self.assertFalse(self.isDone())
+
+    def testIncompleteLine(self):
+        # a crash while appending leaves a partial line
+        path = os.path.join(self.outdir, '.journal-%s' % socket.gethostname())
+        with open(path, 'a') as f:
+            f.write('{"component": "qfp:AB')
+        other = os.path.join(self.outdir, 'ABD.step')
+        with open(other, 'w') as f:
+            f.write('other model')
+        journal = BuildJournal(self.outdir, True)
+        journal.record('qfp:ABD', 'STEP', other, fileHash(other), OPTIONS)
+        journal.close()
+
+        journal = BuildJournal(self.outdir, True)
+        self.assertTrue(journal.isDone('qfp:AKA', 'STEP', self.output, OPTIONS))
+        self.assertTrue(journal.isDone('qfp:ABD', 'STEP', other, OPTIONS))
+        journal.close()
+
+    def testJournalOfOtherMachine(self):
+        os.rename(os.path.join(self.outdir, '.journal-%s' % socket.gethostname()),
+                  os.path.join(self.outdir, '.journal-otherhost'))
+        self.assertTrue(self.isDone())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Tests of archive output: storing models into shards and reading
+# them back.
+#
+
+import os, glob, shutil, tarfile, tempfile, unittest, zipfile
+from e3dmg.output import ArchiveOutput, ArchiveIndex
+
+class ArchiveOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp(prefix='e3dmg-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def write(self, output, name, data):
+        filename = output.path(name)
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return filename
+
+    def models(self, n):
+        # random data doesn't compress, so shard sizes are predictable
+        return dict(('qfp/M%d.step' % i, os.urandom(1000)) for i in range(n))
+
+    def roundTrip(self, fmt, maxSize=1 << 30):
+        outdir = os.path.join(self.outdir, fmt)
+        output = ArchiveOutput(outdir, fmt, maxSize)
+        models = self.models(5)
+        for name, data in sorted(models.items()):
+            location = output.store(self.write(output, name, data))
+            self.assertEqual(output.size(location), len(data))
+        output.close()
+
+        self.assertFalse(os.path.exists(output.staging))
+        index = ArchiveIndex(outdir)
+        self.assertEqual(index.names(), sorted(models))
+        for name, data in models.items():
+            self.assertEqual(index.read(name), data)
+        return glob.glob(os.path.join(outdir, 'models-*.' + fmt))
+
+    def testZip(self):
+        shards = self.roundTrip('zip')
+        self.assertEqual(len(shards), 1)
+        with zipfile.ZipFile(shards[0]) as archive:
+            self.assertEqual(len(archive.namelist()), 5)
+            self.assertIsNone(archive.testzip())
+
+    def testTar(self):
+        shards = self.roundTrip('tar')
+        self.assertEqual(len(shards), 1)
+        archive = tarfile.open(shards[0])
+        self.assertEqual(len(archive.getnames()), 5)
+        archive.close()
+
+    def testShardRollover(self):
+        for fmt in ('zip', 'tar'):
+            shards = self.roundTrip(fmt, 2500)
+            self.assertTrue(len(shards) > 1)
+
+    def testAlias(self):
+        output = ArchiveOutput(self.outdir)
+        location = output.store(self.write(output, 'qfp/A.step', b'same model'))
+        output.alias(output.path('qfp/B.step'), location)
+        output.close()
+
+        index = ArchiveIndex(self.outdir)
+        self.assertEqual(index.names(), ['qfp/A.step', 'qfp/B.step'])
+        self.assertEqual(index.read('qfp/B.step'), b'same model')
+
+    def testExtract(self):
+        output = ArchiveOutput(self.outdir, 'tar')
+        output.store(self.write(output, 'qfp/A.step', b'model'))
+        output.close()
+
+        dest = os.path.join(self.outdir, 'A.step')
+        ArchiveIndex(self.outdir).extract('qfp/A.step', dest)
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b'model')
+        self.assertRaises(Exception, ArchiveIndex(self.outdir).read, 'qfp/C.step')
+
+if __name__ == '__main__':
+    unittest.main()
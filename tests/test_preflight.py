@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015 Hasan Yavuz Özderya
+#
+# This file is part of ecad-3d-model-generator.
+#
+# ecad-3d-model-generator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# ecad-3d-model-generator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ecad-3d-model-generator.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+# Tests of preflight validation of database entries.
+#
+
+import unittest
+from e3dmg import Generator
+from e3dmg.dbutils import LazyGenerator
+from e3dmg.preflight import preflight
+
+class PadGen(Generator):
+
+    def __init__(self, pins, pitch=1.0):
+        self.pins = pins
+        self.pitch = pitch
+
+    def check(self):
+        if self.pitch is None:
+            raise Exception("no pitch")
+        return self.checkPositive('pins', 'pitch')
+
+def entries():
+    params = [(4, 1.0), (0, 1.0), (8, -0.5), (8, None)]
+    r = [dict(package='e3dmg.database.test', name='pad%d' % i,
+              generator=PadGen(pins, pitch))
+         for i, (pins, pitch) in enumerate(params)]
+    # a table row with an unknown generator
+    r.append(dict(package='e3dmg.database.pads', name='row0',
+                  generator=LazyGenerator('nosuch.PadGen', {'pins': 14})))
+    return r
+
+class PreflightTest(unittest.TestCase):
+
+    def check(self, processes):
+        checked, invalid = preflight(iter(entries()), processes, chunksize=2)
+        self.assertEqual(checked, 5)
+        self.assertEqual([(p, n) for p, n, errors in invalid],
+                         [('e3dmg.database.pads', 'row0'),
+                          ('e3dmg.database.test', 'pad1'),
+                          ('e3dmg.database.test', 'pad2'),
+                          ('e3dmg.database.test', 'pad3')])
+        errors = dict((n, e) for p, n, e in invalid)
+        self.assertEqual(errors['pad1'], ["pins=0 must be positive"])
+        self.assertEqual(errors['pad3'], ["check failed: no pitch"])
+        self.assertIn("nosuch", errors['row0'][0])
+
+    def testSerial(self):
+        self.check(1)
+
+    def testParallel(self):
+        self.check(2)
+
+if __name__ == '__main__':
+    unittest.main()